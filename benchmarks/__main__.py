@@ -0,0 +1,117 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime
+
+import discord
+
+from . import bench_command_map, bench_dispatch, bench_memory
+
+# metric name -> whether higher is better
+TRACKED_METRICS = {
+    "cold_commands_per_second": True,
+    "warm_commands_per_second": True,
+    "peak_memory_kib": False,
+    "interactions_per_second": True,
+    "p99_us": False,
+    "requests_per_interaction": False,
+    "bytes_per_context": False,
+}
+IDENTITY_KEYS = ("commands", "mode", "variant", "context", "scenario")
+SECTIONS = ("command_map", "dispatch", "memory")
+
+
+def result_key(section: str, result: dict) -> str:
+    return "/".join([section] + [f"{k}={result[k]}" for k in IDENTITY_KEYS if k in result])
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    old = {result_key(section, r): r for section in SECTIONS for r in baseline.get(section, [])}
+    regressions = 0
+    for section in SECTIONS:
+        for result in current.get(section, []):
+            key = result_key(section, result)
+            if key not in old:
+                continue
+            for metric, higher_is_better in TRACKED_METRICS.items():
+                if metric not in result or not old[key].get(metric, None):
+                    continue
+                change = result[metric] / old[key][metric] - 1
+                regressed = (change < -threshold) if higher_is_better else (change > threshold)
+                regressions += regressed
+                print(f"{'REGRESSION ' if regressed else ''}{key} {metric}: {old[key][metric]:.2f} -> {result[metric]:.2f} ({change:+.1%})")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    results = {
+        "generated_at": datetime.isoformat(datetime.utcnow()),
+        "python": platform.python_version(),
+        "discord.py": discord.__version__,
+    }
+    if not args.skip_command_map:
+        results["command_map"] = await bench_command_map.run(args.sizes, args.repeat)
+        for r in results["command_map"]:
+            print(f"command_map commands={r['commands']}: cold {r['cold_commands_per_second']:.0f}/s, "
+                  f"warm {r['warm_commands_per_second']:.0f}/s, peak {r['peak_memory_kib']:.0f} KiB")
+    if not args.skip_dispatch:
+        results["dispatch"] = await bench_dispatch.run(args.iterations)
+        for r in results["dispatch"]:
+            print(f"dispatch {r['mode']}/{r['context']}/{r['scenario']}: {r['interactions_per_second']:.0f}/s, "
+                  f"p50 {r['p50_us']:.0f}us, p99 {r['p99_us']:.0f}us, {r['requests_per_interaction']:.1f} requests")
+    if not args.skip_memory:
+        results["memory"] = await bench_memory.run(args.contexts)
+        for r in results["memory"]:
+            print(f"memory {r['variant']}/{r['context']}: {r['bytes_per_context']:.0f} bytes per context, "
+                  f"{r['gc_collections']} gc collections for {r['contexts']} contexts")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline slash_cog microbenchmarks")
+    parser.add_argument("--sizes", type=lambda v: [int(n) for n in v.split(",")], default=[10, 100, 1000, 5000],
+                        help="comma separated amounts of synthetic commands to index")
+    parser.add_argument("--repeat", type=int, default=5, help="warm command map generations to take the best of")
+    parser.add_argument("--iterations", type=int, default=2000, help="interactions to dispatch per scenario")
+    parser.add_argument("--contexts", type=int, default=2000, help="contexts to build for the memory benchmark")
+    parser.add_argument("--output", default="benchmarks/results.json", help="where to write the results")
+    parser.add_argument("--compare", default=None, help="baseline results to compare against, exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    parser.add_argument("--skip-command-map", action="store_true")
+    parser.add_argument("--skip-dispatch", action="store_true")
+    parser.add_argument("--skip-memory", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,81 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import time
+import tracemalloc
+import typing
+
+from slash_cog import command_map
+
+from .stubs import make_bot, populate
+
+
+def forget_indexed(cog) -> None:
+    # the cog keeps the payload of every command it indexed, without this only the first run would index anything
+    cog.indexed.clear()
+    cog.command_owners.clear()
+
+
+async def bench_generate(n_commands: int, repeat: int = 5) -> typing.Dict[str, typing.Any]:
+    bot = await make_bot()
+    populate(bot, n_commands)
+    cog = bot.get_cog("SlashCommands")
+    indexed = sum(1 for _ in bot.walk_commands())
+
+    command_map.parameter_cache.invalidate()
+    forget_indexed(cog)
+    start = time.perf_counter()
+    cmd_map = await cog.generate_command_map()
+    cold = time.perf_counter() - start
+
+    warm = float("inf")
+    for _ in range(repeat):
+        forget_indexed(cog)
+        start = time.perf_counter()
+        await cog.generate_command_map()
+        warm = min(warm, time.perf_counter() - start)
+
+    # measured separately, tracemalloc slows everything down
+    command_map.parameter_cache.invalidate()
+    forget_indexed(cog)
+    tracemalloc.start()
+    await cog.generate_command_map()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await bot.close()
+    return {
+        "commands": n_commands,
+        "indexed_commands": indexed,
+        "top_level_entries": len(cmd_map),
+        "cold_seconds": cold,
+        "warm_seconds": warm,
+        "cold_commands_per_second": indexed / cold,
+        "warm_commands_per_second": indexed / warm,
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+async def run(sizes: typing.Sequence[int], repeat: int = 5) -> typing.List[typing.Dict[str, typing.Any]]:
+    return [await bench_generate(n, repeat) for n in sizes]
@@ -0,0 +1,90 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import time
+import typing
+
+from slash_cog.api_constants import ApplicationCommandOptionType
+
+from .stubs import install_adapter, interaction_payload, make_bot, make_interaction, option, populate, subcommand
+
+SCENARIOS = [
+    # name, top-level command, options
+    ("flat", "cmd1", [option("text", "hello there, general")]),
+    ("subcommand", "cmd0", [subcommand("sub1", [option("text", "hello"), option("amount", 3, ApplicationCommandOptionType.INTEGER)])]),
+    ("subcommand_group", "cmd0", [subcommand("nested", [subcommand("leaf", [option("text", "hi"), option("amount", 1, ApplicationCommandOptionType.INTEGER)])], group=True)]),
+]
+
+
+def percentile(sorted_values: typing.List[float], pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+async def bench_scenario(direct: bool, guild: bool, scenario: typing.Tuple[str, str, list], iterations: int,
+                         n_commands: int = 100) -> typing.Dict[str, typing.Any]:
+    adapter = install_adapter()
+    bot = await make_bot(DIRECT_DISPATCH=direct)
+    populate(bot, n_commands)
+    cog = bot.get_cog("SlashCommands")
+    name, cmd_name, options = scenario
+
+    completed = []
+
+    async def on_command_completion(ctx):
+        completed.append(ctx)
+    bot.add_listener(on_command_completion)
+
+    interactions = [make_interaction(bot, interaction_payload(cmd_name, options, guild=guild)) for _ in range(iterations)]
+    latencies = []
+    start = time.perf_counter()
+    for interaction in interactions:
+        t = time.perf_counter()
+        await cog.on_interaction(interaction)
+        latencies.append(time.perf_counter() - t)
+    total = time.perf_counter() - start
+    await asyncio.sleep(0.01)  # let the completion events run
+
+    latencies.sort()
+    await bot.close()
+    return {
+        "mode": "direct" if direct else "legacy",
+        "context": "guild" if guild else "dm",
+        "scenario": name,
+        "iterations": iterations,
+        "completed": len(completed),
+        "interactions_per_second": iterations / total,
+        "p50_us": percentile(latencies, 0.5) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "requests_per_interaction": adapter.requests / iterations,
+    }
+
+
+async def run(iterations: int = 2000) -> typing.List[typing.Dict[str, typing.Any]]:
+    results = []
+    for direct in (False, True):
+        for guild in (True, False):
+            for scenario in SCENARIOS:
+                results.append(await bench_scenario(direct, guild, scenario, iterations))
+    return results
@@ -0,0 +1,110 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import gc
+import tracemalloc
+import typing
+from datetime import datetime
+
+import discord
+
+from slash_cog.context import InteractContext
+
+from .bench_dispatch import SCENARIOS
+from .stubs import install_adapter, interaction_payload, make_bot, make_interaction, populate
+
+
+class PayloadMessage(discord.Message):
+    def __init__(self, *, state, channel, data, parent_interaction: discord.Interaction):
+        super().__init__(state=state, channel=channel, data=data)
+        self.parent_interaction = parent_interaction
+
+
+async def payload_message_context(cog, interaction: discord.Interaction, ch, plan, options) -> InteractContext:
+    # baseline: how contexts were built before PartialInteractMessage, a full discord.Message parsed from a fake payload
+    args = list(plan.path[1:]) + [options[name]["value"] for name in plan.option_order if name in options]
+    user = interaction.user
+    now_datestr = datetime.isoformat(datetime.utcnow())
+    data = {
+        # the cog's prefix only applies to its own message proxy, this goes through the bot's
+        "content": f"{cog.bot.command_prefix}{plan.path[0]} {' '.join(map(str, args))}".strip(),
+        "author": {"id": user.id, "username": user.name, "discriminator": user.discriminator, "avatar": None},
+        "id": 0, "attachments": [], "embeds": [], "edited_timestamp": now_datestr, "type": discord.MessageType.default,
+        "pinned": False, "mention_everyone": False, "tts": False,
+    }
+    if interaction.guild is not None:
+        data["member"] = {
+            "roles": list(user._roles), "premium_since": None, "pending": False, "mute": False, "joined_at": now_datestr,
+            "deaf": False, "nick": user.nick, "communication_disabled_until": None, "avatar": None,
+        }
+    msg = PayloadMessage(channel=ch, data=data, state=cog.bot._connection, parent_interaction=interaction)
+    return await cog.bot.get_context(msg, cls=InteractContext)
+
+
+async def bench_contexts(variant: str, guild: bool, n: int) -> typing.Dict[str, typing.Any]:
+    bot = await make_bot()
+    populate(bot, 10)
+    cog = bot.get_cog("SlashCommands")
+    _, cmd_name, options = SCENARIOS[0]
+    interactions = [make_interaction(bot, interaction_payload(cmd_name, options, guild=guild)) for _ in range(n)]
+    cog.dispatch_index.build(bot.commands)
+    plan, bound, _ = cog.dispatch_index.resolve(interactions[0].data)
+
+    build = {
+        "payload_message": lambda i: payload_message_context(cog, i, i.channel, plan, bound),
+        "legacy": lambda i: cog.get_legacy_context(i, i.channel, plan, bound),
+        "direct": lambda i: cog.get_direct_context(i, i.channel, plan),
+    }[variant]
+    await build(interactions[0])  # warm up caches and lazy imports outside of the measurement
+
+    gc.collect()
+    collections = sum(s["collections"] for s in gc.get_stats())
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    contexts = [await build(i) for i in interactions]
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections
+
+    author_type = type(contexts[0].author).__name__
+    del contexts
+    await bot.close()
+    return {
+        "variant": variant,
+        "context": "guild" if guild else "dm",
+        "contexts": n,
+        "bytes_per_context": (after - before) / n,
+        "peak_bytes_per_context": (peak - before) / n,
+        "gc_collections": collections,
+        "author_type": author_type,
+    }
+
+
+async def run(n: int = 2000) -> typing.List[typing.Dict[str, typing.Any]]:
+    install_adapter()
+    results = []
+    for guild in (True, False):
+        for variant in ("payload_message", "legacy", "direct"):
+            results.append(await bench_contexts(variant, guild, n))
+    return results
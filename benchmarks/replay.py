@@ -0,0 +1,228 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import typing
+
+from discord.ext import commands
+
+from slash_cog.api_constants import ApplicationCommandOptionType
+from slash_cog.capture import read_capture
+from slash_cog.dispatch import SUB_COMMAND_TYPES
+
+from .bench_dispatch import percentile
+from .stubs import install_adapter, interaction_payload, make_bot, make_interaction, snowflake
+
+OPTION_ANNOTATIONS = {
+    ApplicationCommandOptionType.INTEGER: "int",
+    ApplicationCommandOptionType.BOOLEAN: "bool",
+    ApplicationCommandOptionType.NUMBER: "float",
+}
+
+
+def collect_shapes(entries: typing.List[dict]) -> dict:
+    """Merges the command paths and option names seen in the capture into a tree"""
+    tree = {}
+
+    def walk(node: dict, options: typing.List[dict]) -> None:
+        for opt in options:
+            if opt["type"] in SUB_COMMAND_TYPES:
+                walk(node.setdefault("children", {}).setdefault(opt["name"], {}), opt.get("options", []))
+            else:
+                node.setdefault("params", {}).setdefault(opt["name"], opt["type"])
+
+    for entry in entries:
+        data = entry["payload"].get("data", None) or {}
+        if "name" in data:
+            walk(tree.setdefault(data["name"], {}), data.get("options", []))
+    return tree
+
+
+def make_replay_callback(name: str, params: typing.Dict[str, int], work: typing.Callable) -> typing.Callable:
+    # every option is optional, not every recorded invocation passes all of them
+    signature = "".join(f", {p}: {OPTION_ANNOTATIONS.get(t, 'str')} = None" for p, t in params.items())
+    src = f"async def {name}(ctx{signature}):\n    await work(ctx)\n"
+    namespace = {"work": work}
+    exec(compile(src, f"<replay:{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def synthesize_commands(bot: commands.Bot, tree: dict, work: typing.Callable) -> None:
+    """Adds no-op stand-ins for every captured command, for when the bot's real extensions can't be loaded offline"""
+    def build(name: str, node: dict, depth: int) -> commands.Command:
+        callback = make_replay_callback(f"replay_{depth}_{name.replace('-', '_')}", node.get("params", {}), work)
+        if "children" not in node:
+            return commands.Command(callback, name=name)
+        group = commands.Group(callback, name=name)
+        for child_name, child in node["children"].items():
+            group.add_command(build(child_name, child, depth + 1))
+        return group
+
+    for name, node in tree.items():
+        bot.add_command(build(name, node, 0))
+
+
+def replay_payload(captured: dict) -> dict:
+    """Fills in what the capture leaves out (the token, fields newer discord.py versions require) with fresh values"""
+    data = captured.get("data", None) or {}
+    payload = interaction_payload(data.get("name", ""), guild="guild_id" in captured)
+    for key in ("channel", "member"):
+        if key in captured:
+            payload[key] = dict(payload[key], **captured[key])
+    for key, value in captured.items():
+        if key not in ("channel", "member"):
+            payload[key] = value
+    payload["id"] = snowflake()
+    return payload
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps for a fixed interval"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []  # type: typing.List[float]
+        self._task = None  # type: typing.Optional[asyncio.Task]
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+def summarize(values: typing.List[float]) -> typing.Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        "p50_ms": percentile(values, 0.5) * 1e3,
+        "p90_ms": percentile(values, 0.9) * 1e3,
+        "p99_ms": percentile(values, 0.99) * 1e3,
+        "max_ms": values[-1] * 1e3,
+    }
+
+
+async def replay(entries: typing.List[dict], speed: float = 1.0, extensions: typing.Sequence[str] = (),
+                 http_latency: float = 0.0, work_scale: float = 1.0, direct: bool = False) -> typing.Dict[str, typing.Any]:
+    adapter = install_adapter(http_latency)
+    bot = await make_bot(http_latency, DIRECT_DISPATCH=direct)
+    cog = bot.get_cog("SlashCommands")
+
+    durations = {}  # type: typing.Dict[int, float]
+
+    async def work(ctx: commands.Context) -> None:
+        # stands in for whatever the command did, replaying the time it originally took
+        duration = durations.get(ctx.parent_interaction.id, 0.0) * work_scale
+        if duration:
+            await asyncio.sleep(duration)
+        await ctx.send("ok")
+
+    if extensions:
+        for ext in extensions:
+            await bot.load_extension(ext)
+    else:
+        synthesize_commands(bot, collect_shapes(entries), work)
+
+    errors = []
+
+    async def on_command_error(ctx, error):
+        errors.append(error)
+    bot.add_listener(on_command_error)
+
+    latencies = []  # type: typing.List[float]
+
+    async def dispatch(interaction, due: float) -> None:
+        try:
+            await cog.on_interaction(interaction)
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - due)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    tasks = []
+    first_offset = entries[0]["t"] if entries else 0.0
+    start = time.perf_counter()
+    for entry in entries:
+        due = start + (entry["t"] - first_offset) / speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        interaction = make_interaction(bot, replay_payload(entry["payload"]))
+        durations[interaction.id] = entry.get("duration", 0.0)
+        tasks.append(asyncio.ensure_future(dispatch(interaction, due)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+    monitor.stop()
+    await bot.close()
+
+    return {
+        "interactions": len(entries),
+        "speed": speed,
+        "captured_seconds": (entries[-1]["t"] - first_offset) if entries else 0.0,
+        "wall_seconds": wall,
+        "throughput_per_second": len(entries) / wall if wall else 0.0,
+        "errors": len(errors),
+        "http_requests": adapter.requests,
+        "latency": summarize(latencies),
+        "loop_lag": summarize(monitor.samples),
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    entries = list(read_capture(args.capture))
+    if args.limit:
+        entries = entries[:args.limit]
+    result = await replay(entries, args.speed, args.extension, args.http_latency, args.work_scale, args.direct)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description="Replays a SlashCommands.CAPTURE_PATH log offline")
+    parser.add_argument("capture", help="the captured .jsonl or .jsonl.gz log")
+    parser.add_argument("--speed", type=float, default=1.0, help="how much faster than recorded to replay, e.g. 1 to 100")
+    parser.add_argument("--extension", action="append", default=[],
+                        help="extension providing the captured commands, stand-ins are synthesized from the capture if omitted")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="simulated round trip of every Discord request, in seconds")
+    parser.add_argument("--work-scale", type=float, default=1.0, help="multiplier for the recorded handling time the stand-ins sleep for")
+    parser.add_argument("--direct", action="store_true", help="replay with SlashCommands.DIRECT_DISPATCH enabled")
+    parser.add_argument("--limit", type=int, default=0, help="only replay the first N interactions")
+    parser.add_argument("--output", default=None, help="also write the report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,222 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import itertools
+import logging
+import typing
+
+import discord
+from discord.ext import commands
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+import slash_cog
+from slash_cog.api_constants import ApplicationCommandOptionType, ApplicationCommandType
+
+APPLICATION_ID = 100000000000000001
+GUILD_ID = 100000000000000002
+CHANNEL_ID = 100000000000000003
+BOT_USER_ID = 100000000000000004
+
+_snowflakes = itertools.count(200000000000000000)
+
+
+def snowflake() -> str:
+    return str(next(_snowflakes))
+
+
+def user_payload(user_id: int, name: str = "user") -> dict:
+    return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None, "avatar": None}
+
+
+def message_payload(channel_id: int, content: str = "", embeds: list = None) -> dict:
+    return {
+        "id": snowflake(), "channel_id": str(channel_id), "type": 0, "content": content or "",
+        "author": user_payload(APPLICATION_ID, "bot"), "embeds": embeds or [], "attachments": [], "mentions": [],
+        "mention_roles": [], "mention_everyone": False, "pinned": False, "tts": False,
+        "timestamp": "2022-01-01T00:00:00+00:00", "edited_timestamp": None, "flags": 0,
+    }
+
+
+class StubWebhookAdapter(AsyncWebhookAdapter):
+    """Answers the interaction/webhook endpoints locally, optionally after a simulated round trip"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+
+    async def request(self, route, session=None, *, payload=None, multipart=None, files=None, **kwargs) -> typing.Any:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if route.method == "DELETE":
+            return None
+        path = route.path
+        if path.endswith("/callback"):
+            response_type = (payload or {}).get("type", 5)
+            resource = {"type": response_type}
+            if response_type == 4:
+                data = payload.get("data", {})
+                resource["message"] = message_payload(CHANNEL_ID, data.get("content", ""), data.get("embeds", []))
+            return {"interaction": {"id": snowflake(), "type": 2, "response_message_loading": response_type == 5,
+                                    "response_message_ephemeral": False}, "resource": resource}
+        data = payload or {}
+        return message_payload(CHANNEL_ID, data.get("content", ""), data.get("embeds", []))
+
+
+class StubHTTP:
+    """Stands in for bot.http.request on the application command endpoints"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.commands = {}  # type: typing.Dict[str, typing.List[dict]]
+        self.calls = []  # type: typing.List[typing.Tuple[str, str]]
+
+    async def request(self, route, **kwargs) -> typing.Any:
+        self.calls.append((route.method, route.path))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = route.path
+        base, _, cmd_id = path.rpartition("/commands")
+        registered = self.commands.setdefault(base, [])
+        if route.method == "GET":
+            return registered
+        if route.method == "PUT":
+            self.commands[base] = [dict(c, id=snowflake()) for c in kwargs.get("json", [])]
+            return self.commands[base]
+        if route.method == "POST":
+            registered.append(dict(kwargs["json"], id=snowflake()))
+            return registered[-1]
+        cmd_id = cmd_id.strip("/")
+        if route.method == "PATCH":
+            for i, c in enumerate(registered):
+                if c["id"] == cmd_id:
+                    registered[i] = dict(kwargs["json"], id=cmd_id)
+            return kwargs["json"]
+        if route.method == "DELETE":
+            self.commands[base] = [c for c in registered if c["id"] != cmd_id]
+        return None
+
+
+def install_adapter(latency: float = 0.0) -> StubWebhookAdapter:
+    adapter = StubWebhookAdapter(latency)
+    async_context.set(adapter)
+    return adapter
+
+
+async def make_bot(http_latency: float = 0.0, **cog_options: typing.Any) -> commands.Bot:
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none(), help_command=None)
+    await bot._async_setup_hook()
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID, "bot"))
+    state.application_id = APPLICATION_ID
+    bot.http.request = StubHTTP(http_latency).request
+
+    # some options are read when the cog is constructed, only override them for this bot
+    previous = {k: getattr(slash_cog.SlashCommands, k) for k in cog_options.keys()}
+    for k, v in cog_options.items():
+        setattr(slash_cog.SlashCommands, k, v)
+    try:
+        await bot.load_extension("slash_cog")
+    finally:
+        for k, v in previous.items():
+            setattr(slash_cog.SlashCommands, k, v)
+    cog = bot.get_cog("SlashCommands")
+    for k, v in cog_options.items():
+        setattr(cog, k, v)
+    cog.logger.setLevel(logging.WARNING)
+    return bot
+
+
+PARAM_TEMPLATES = [
+    ("text", str, "Some text to work with"),
+    ("amount", int, "How many times to do it"),
+    ("ratio", float, "A scaling factor"),
+    ("flag", bool, "Whether to enable it"),
+]
+
+
+def make_callback(name: str, n_params: int) -> typing.Callable:
+    params = PARAM_TEMPLATES[:n_params]
+    signature = ", ".join(f"{p}: {t.__name__}" for p, t, _ in params)
+    doc = "\n".join(f"        :param {p}: {d}" for p, _, d in params)
+    src = (
+        f"async def {name}(ctx{', ' if signature else ''}{signature}):\n"
+        f"    \"\"\"Synthetic command {name}\n\n"
+        f"        :param ctx: invocation context\n{doc}\n    \"\"\"\n"
+    )
+    namespace = {}
+    exec(compile(src, f"<bench:{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def populate(bot: commands.Bot, n_commands: int, group_every: int = 10, subcommands: int = 3) -> None:
+    """Adds n_commands top-level commands, every group_every-th one a group with nested subcommands"""
+    for i in range(n_commands):
+        name = f"cmd{i}"
+        if group_every and i % group_every == 0:
+            group = commands.Group(make_callback(name, 0), name=name)
+            for j in range(subcommands):
+                group.add_command(commands.Command(make_callback(f"{name}_sub{j}", (j % 4) + 1), name=f"sub{j}"))
+            nested = commands.Group(make_callback(f"{name}_nested", 0), name="nested")
+            nested.add_command(commands.Command(make_callback(f"{name}_leaf", 2), name="leaf"))
+            group.add_command(nested)
+            bot.add_command(group)
+        else:
+            bot.add_command(commands.Command(make_callback(name, i % 5), name=name))
+
+
+def interaction_payload(name: str, options: list = None, guild: bool = True, user_id: int = 300000000000000001) -> dict:
+    data = {
+        "id": snowflake(), "application_id": str(APPLICATION_ID), "type": 2, "token": f"token{snowflake()}", "version": 1,
+        "data": {"id": snowflake(), "name": name, "type": ApplicationCommandType.CHAT_INPUT, "options": options or []},
+        "app_permissions": str(discord.Permissions.all().value), "locale": "en-US", "attachment_size_limit": 8388608,
+        "entitlements": [], "authorizing_integration_owners": {},
+    }
+    if guild:
+        data["guild_id"] = str(GUILD_ID)
+        data["channel_id"] = str(CHANNEL_ID)
+        data["channel"] = {"id": str(CHANNEL_ID), "type": 0, "guild_id": str(GUILD_ID), "name": "general", "position": 0,
+                           "permission_overwrites": [], "nsfw": False, "parent_id": None}
+        data["member"] = {"user": user_payload(user_id), "roles": [str(GUILD_ID)], "joined_at": "2022-01-01T00:00:00+00:00",
+                          "deaf": False, "mute": False, "flags": 0, "permissions": str(discord.Permissions.all().value)}
+    else:
+        data["channel_id"] = str(CHANNEL_ID)
+        data["channel"] = {"id": str(CHANNEL_ID), "type": 1, "recipients": [user_payload(user_id)]}
+        data["user"] = user_payload(user_id)
+    return data
+
+
+def option(name: str, value: typing.Any, type_: ApplicationCommandOptionType = ApplicationCommandOptionType.STRING) -> dict:
+    return {"name": name, "type": int(type_), "value": value}
+
+
+def subcommand(name: str, options: list, group: bool = False) -> dict:
+    return {"name": name, "type": int(ApplicationCommandOptionType.SUB_COMMAND_GROUP if group else ApplicationCommandOptionType.SUB_COMMAND),
+            "options": options}
+
+
+def make_interaction(bot: commands.Bot, payload: dict) -> discord.Interaction:
+    return discord.Interaction(data=payload, state=bot._connection)
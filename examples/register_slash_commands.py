@@ -16,6 +16,7 @@ class RegisterSlashCommands(commands.Cog):
         await self.bot.wait_until_ready()
 
         # do not register commands as we are probably running on a separate instance
+        # (not needed if SlashCommands.COORDINATION_PATH is set, register_coordinated only lets one process register)
         if isinstance(self.bot, commands.AutoShardedBot):
             if 0 not in self.bot.shard_ids:
                 return
@@ -28,6 +29,11 @@ class RegisterSlashCommands(commands.Cog):
 
         hidden_commands = await self.s_cog.generate_command_map(set(filter(lambda c: c.hidden, self.bot.commands)))
         await self.s_cog.register_commands("/guilds/123456789123456789", hidden_commands)
+        # re-register them (debounced) whenever a cog or extension with matching commands gets reloaded
+        self.s_cog.watch_endpoint("/guilds/123456789123456789", lambda c: c.hidden)
+
+        # MULTI-PROCESS CLUSTERS: one process generates and registers the map, the others reuse what it published
+        # await self.s_cog.register_coordinated("/guilds/123456789123456789", set(filter(lambda c: c.hidden, self.bot.commands)))
 
     # OPTIONAL:
     # def cog_unload(self):
@@ -29,7 +29,10 @@ from slash_cog.api_constants import *
 from slash_cog.cog import SlashCommands
 from slash_cog.command_map import index_command
 from slash_cog.context import InteractContext
-from slash_cog.decorator import inject_extracted
+from slash_cog.coordination import CoordinationBackend, FileLockBackend, LoopbackBackend
+from slash_cog.autocomplete import PrefixIndex
+from slash_cog.bulk import GuildOverlay
+from slash_cog.decorator import autocomplete, coalesce, defer, inject_extracted, offload
 
 
 async def setup(bot: Bot):
@@ -0,0 +1,82 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import discord
+from discord.ext import commands
+
+from . import manifest
+
+
+async def build(args: argparse.Namespace) -> int:
+    bot = commands.Bot(command_prefix=args.prefix, intents=discord.Intents.none())
+    if args.token:
+        await bot.login(args.token)  # http only, needed to resolve owner IDs and the application ID
+    else:
+        await bot._async_setup_hook()
+    if args.owner_id:
+        bot.owner_ids = set(args.owner_id)
+
+    try:
+        # slash_cog patches the checks it extracts, it has to come before the extensions defining commands
+        await bot.load_extension("slash_cog")
+        for ext in args.extensions:
+            await bot.load_extension(ext)
+
+        cog = bot.get_cog("SlashCommands")
+        data = await manifest.build_manifest(cog.logger, bot)
+        manifest.write_manifest(args.output, data)
+        cog.logger.info(f"Wrote {len(data['commands'])} top-level commands to {args.output}")
+    finally:
+        await bot.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m slash_cog")
+    subparsers = parser.add_subparsers(dest="action")
+    subparsers.required = True
+
+    build_parser = subparsers.add_parser("build", help="prebuild the command manifest for SlashCommands.MANIFEST_PATH")
+    build_parser.add_argument("extensions", nargs="+", help="extensions to load, in load order")
+    build_parser.add_argument("-o", "--output", default="slash_manifest.json")
+    build_parser.add_argument("--prefix", default="!", help="command prefix, only matters to extensions that read it")
+    build_parser.add_argument("--token", default=os.environ.get("DISCORD_TOKEN", None),
+                              help="bot token (default: $DISCORD_TOKEN), only needed for owner-only commands without --owner-id")
+    build_parser.add_argument("--owner-id", type=int, action="append", default=[], help="bot owner ID, can be repeated")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.action == "build":
+        return asyncio.run(build(args))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,6 +42,7 @@ class ApplicationCommandOptionType(IntEnum):
     ROLE = 8
     MENTIONABLE = 9
     NUMBER = 10
+    ATTACHMENT = 11
 
 
 class ApplicationCommandPermissionType(IntEnum):
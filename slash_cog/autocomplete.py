@@ -0,0 +1,102 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import typing
+from bisect import bisect_left, bisect_right
+
+from .cache import TTLCache
+
+MAX_CHOICES = 25  # discord limit
+MAX_CHOICE_NAME = 100
+
+Choice = typing.Tuple[str, typing.Union[str, int, float]]  # name, value
+
+
+def _pair(choice: typing.Union[str, Choice]) -> Choice:
+    if isinstance(choice, str):
+        return choice, choice
+    return choice[0], choice[1]
+
+
+class PrefixIndex:
+    """Case-insensitive prefix index over autocomplete choices, kept as a sorted array searched with bisect
+
+    Lookups are O(log n + 25) regardless of the amount of choices and their results are cached until the next update.
+    """
+
+    def __init__(self, choices: typing.Iterable[typing.Union[str, Choice]] = (), cache_size: int = 2048):
+        self.keys = []  # type: typing.List[str]
+        self.choices = []  # type: typing.List[Choice]
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+        self.replace(choices)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def replace(self, choices: typing.Iterable[typing.Union[str, Choice]]) -> None:
+        pairs = sorted(dict.fromkeys(_pair(c) for c in choices), key=lambda c: c[0].casefold())
+        self.keys = [name.casefold() for name, _ in pairs]
+        self.choices = pairs
+        self.cache.clear()
+
+    def add(self, choices: typing.Iterable[typing.Union[str, Choice]]) -> None:
+        pairs = [_pair(c) for c in choices]
+        if len(pairs) > 64 and len(pairs) > len(self.keys) // 16:
+            # cheaper to re-sort everything than to shift the arrays once per insert
+            return self.replace(self.choices + pairs)
+        for pair in pairs:
+            key = pair[0].casefold()
+            lo = bisect_left(self.keys, key)
+            hi = bisect_right(self.keys, key, lo)
+            if pair in self.choices[lo:hi]:
+                continue
+            self.keys.insert(hi, key)
+            self.choices.insert(hi, pair)
+        self.cache.clear()
+
+    def remove(self, choices: typing.Iterable[typing.Union[str, Choice]]) -> None:
+        for pair in map(_pair, choices):
+            key = pair[0].casefold()
+            lo = bisect_left(self.keys, key)
+            hi = bisect_right(self.keys, key, lo)
+            for i in range(lo, hi):
+                if self.choices[i] == pair:
+                    del self.keys[i]
+                    del self.choices[i]
+                    break
+        self.cache.clear()
+
+    def search(self, prefix: str, limit: int = MAX_CHOICES) -> typing.List[Choice]:
+        prefix = prefix.casefold()
+        cache_key = (prefix, limit)
+        results = self.cache.get(cache_key, None)
+        if results is not None:
+            return results
+
+        start = bisect_left(self.keys, prefix)
+        # every key starting with the prefix sorts before prefix + the highest code point
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start, min(start + limit, len(self.keys)))
+        results = self.choices[start:end]
+        self.cache.set(cache_key, results)
+        return results
@@ -0,0 +1,93 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import typing
+
+import discord
+from discord.ext import commands
+
+ProgressCallback = typing.Callable[[int, int, int, typing.Optional[BaseException]], None]  # done, total, guild ID, error
+
+
+class GuildOverlay:
+    """A guild's changes to the shared base command map: extra commands, hidden commands and renamed commands"""
+
+    def __init__(self, extra: typing.Iterable[commands.Command] = (), hidden: typing.Iterable[str] = (),
+                 renamed: typing.Dict[str, str] = None):
+        self.extra = list(extra)
+        self.hidden = set(hidden)
+        self.renamed = dict(renamed or {})
+
+    def apply(self, base: typing.List[dict], extra_payloads: typing.Dict[commands.Command, typing.Optional[dict]]) -> typing.List[dict]:
+        # untouched base entries are shared between guilds, only renamed ones are copied
+        cmd_map = {}  # type: typing.Dict[str, dict]  # command names are unique per guild, extras replace base entries
+        for cmd_data in base:
+            name = cmd_data["name"]
+            if name in self.hidden:
+                continue
+            if name in self.renamed:
+                cmd_data = dict(cmd_data, name=self.renamed[name])
+            cmd_map[cmd_data["name"]] = cmd_data
+        for cmd in self.extra:
+            cmd_data = extra_payloads.get(cmd, None)
+            if cmd_data is not None:
+                cmd_map[cmd_data["name"]] = cmd_data
+        return list(cmd_map.values())
+
+    def aliases(self) -> typing.Dict[str, str]:
+        """What the renamed commands are called on discord -> their actual names"""
+        return {new: old for old, new in self.renamed.items()}
+
+
+class BulkResult:
+    def __init__(self):
+        self.registered = []  # type: typing.List[int]
+        self.unchanged = []  # type: typing.List[int]
+        self.failed = {}  # type: typing.Dict[int, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def summary(self) -> str:
+        summary = f"{len(self.registered)} registered, {len(self.unchanged)} unchanged, {len(self.failed)} failed"
+        for guild_id, error in self.failed.items():
+            summary += f"\n  {guild_id}: {type(error).__name__}: {error}"
+        return summary
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+def retry_delay(error: BaseException, attempt: int, base: float = 1.0) -> float:
+    if isinstance(error, discord.HTTPException) and error.status == 429 and error.response is not None:
+        try:
+            return float(error.response.headers.get("Retry-After", base))
+        except (TypeError, ValueError):
+            pass
+    return base * 2 ** attempt
@@ -0,0 +1,211 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import copy
+import gzip
+import hashlib
+import json
+import os
+import time
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import discord
+
+from .api_constants import ApplicationCommandOptionType
+
+CAPTURE_VERSION = 1
+USER_OPTION_TYPES = (ApplicationCommandOptionType.USER, ApplicationCommandOptionType.MENTIONABLE)
+
+
+def open_log(path: str, mode: str) -> typing.TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def user_to_payload(user: typing.Union[discord.User, discord.Member]) -> dict:
+    return {
+        "id": str(user.id),
+        "username": user.name,
+        "discriminator": user.discriminator,
+        "global_name": getattr(user, "global_name", None),
+        "avatar": None,
+        "bot": user.bot,
+    }
+
+
+def interaction_to_payload(interaction: discord.Interaction) -> dict:
+    """Rebuilds the parts of an INTERACTION_CREATE payload the cog relies on, the token is never included"""
+    payload = {
+        "id": str(interaction.id),
+        "application_id": str(interaction.application_id),
+        "type": interaction.type.value,
+        "version": interaction.version,
+        "data": interaction.data,
+        "locale": interaction.locale.value,
+        "app_permissions": str(interaction.app_permissions.value),
+    }
+    if interaction.guild_locale is not None:
+        payload["guild_locale"] = interaction.guild_locale.value
+    if interaction.guild_id is not None:
+        payload["guild_id"] = str(interaction.guild_id)
+
+    ch = interaction.channel
+    if ch is not None:
+        payload["channel_id"] = str(ch.id)
+        payload["channel"] = {"id": str(ch.id), "type": ch.type.value}
+        if getattr(ch, "name", None) is not None:
+            payload["channel"]["name"] = ch.name
+
+    user = interaction.user
+    if isinstance(user, discord.Member):
+        payload["member"] = {
+            "user": user_to_payload(user),
+            "roles": [str(role_id) for role_id in user._roles],
+            "nick": user.nick,
+            "joined_at": user.joined_at.isoformat() if user.joined_at is not None else None,
+            "permissions": str(interaction.permissions.value),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+    else:
+        payload["user"] = user_to_payload(user)
+    return payload
+
+
+class Anonymizer:
+    """Consistently replaces user IDs and names with salted hashes"""
+
+    def __init__(self, salt: str = None):
+        self.salt = salt if salt is not None else os.urandom(16).hex()
+
+    def user_id(self, user_id: typing.Union[int, str]) -> str:
+        digest = hashlib.sha256(f"{self.salt}:{user_id}".encode("utf-8")).hexdigest()
+        # keep it looking like a snowflake so it parses everywhere a user ID does
+        return str(int(digest[:15], 16) | (1 << 60))
+
+    def user(self, user: dict) -> dict:
+        anon_id = self.user_id(user["id"])
+        return dict(user, id=anon_id, username=f"user{anon_id[-6:]}", global_name=None, avatar=None)
+
+    def options(self, options: typing.List[dict]) -> None:
+        for opt in options:
+            if opt["type"] in USER_OPTION_TYPES and "value" in opt:
+                opt["value"] = self.user_id(opt["value"])
+            self.options(opt.get("options", []))
+
+    def payload(self, payload: dict) -> dict:
+        payload = copy.deepcopy(payload)
+        if "member" in payload:
+            payload["member"]["user"] = self.user(payload["member"]["user"])
+            payload["member"]["nick"] = None
+        if "user" in payload:
+            payload["user"] = self.user(payload["user"])
+
+        data = payload.get("data", None) or {}
+        self.options(data.get("options", []))
+        resolved = data.get("resolved", {})
+        if "users" in resolved:
+            resolved["users"] = {self.user_id(k): self.user(v) for k, v in resolved["users"].items()}
+        if "members" in resolved:
+            resolved["members"] = {self.user_id(k): dict(v, nick=None) for k, v in resolved["members"].items()}
+        return payload
+
+
+class InteractionRecorder:
+    """
+    Appends interactions and how long they took to handle to a JSONL log (gzipped if the path ends with .gz).
+    Entries are buffered and written in batches by a single writer thread, so the event loop never touches the file.
+    """
+
+    def __init__(self, path: str, anonymize: bool = False, salt: str = None, batch_size: int = 64,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.anonymizer = Anonymizer(salt) if anonymize else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.started = time.perf_counter()
+        self.count = 0
+        self._pending = []  # type: typing.List[dict]
+        self._flushed_at = self.started
+        self._last_write = None  # type: typing.Optional[Future]
+        # one worker, batches have to be written in order
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="slash_cog-capture")
+        self._file = open_log(path, "a")
+        self._pending.append({"version": CAPTURE_VERSION, "started_at": datetime.isoformat(datetime.utcnow()), "anonymized": anonymize})
+        self.flush()
+
+    def _write(self, entries: typing.List[dict]) -> None:
+        lines = []
+        for entry in entries:
+            if self.anonymizer is not None and "payload" in entry:
+                entry["payload"] = self.anonymizer.payload(entry["payload"])
+            lines.append(json.dumps(entry, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def record(self, interaction: discord.Interaction, received: float, duration: float) -> None:
+        """received is a time.perf_counter() value"""
+        self._pending.append({
+            "t": round(received - self.started, 6), "duration": round(duration, 6), "payload": interaction_to_payload(interaction)
+        })
+        self.count += 1
+        if len(self._pending) >= self.batch_size or time.perf_counter() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hands the buffered entries over to the writer thread"""
+        self._flushed_at = time.perf_counter()
+        if self._pending:
+            entries, self._pending = self._pending, []
+            self._last_write = self._writer.submit(self._write, entries)
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.shutdown(wait=True)
+        self._file.close()
+        if self._last_write is not None:
+            self._last_write.result()  # raises if the last batch couldn't be written
+
+
+def read_capture(path: str) -> typing.Iterator[dict]:
+    """Yields the recorded entries, offsets of captures appended after a restart continue where the previous one ended"""
+    base = 0.0
+    last = 0.0
+    with open_log(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "version" in entry:
+                if entry["version"] != CAPTURE_VERSION:
+                    raise ValueError(f"Unsupported capture version {entry['version']} in {path}")
+                base = last
+                continue
+            entry["t"] += base
+            last = entry["t"]
+            yield entry
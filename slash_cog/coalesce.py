@@ -0,0 +1,161 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import inspect
+import logging
+import typing
+
+import discord
+
+# discord limits for a single message
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+MAX_FILES = 10
+
+COALESCABLE_SEND_KWARGS = {"content", "embed", "embeds", "file", "files"}
+
+log = logging.getLogger(__name__)
+
+
+class PendingMessage:
+    """Handle for a send that was buffered, awaiting it (or calling one of its coroutine methods) flushes the buffer"""
+    __slots__ = ("coalescer", "future")
+
+    def __init__(self, coalescer: "SendCoalescer", future: asyncio.Future):
+        self.coalescer = coalescer
+        self.future = future
+
+    @property
+    def sent(self) -> bool:
+        return self.future.done()
+
+    async def resolve(self) -> discord.Message:
+        if not self.future.done():
+            await self.coalescer.flush()
+        return await self.future
+
+    def __await__(self):
+        return self.resolve().__await__()
+
+    def __getattr__(self, name: str) -> typing.Any:
+        if self.future.done():
+            return getattr(self.future.result(), name)
+        if inspect.iscoroutinefunction(getattr(discord.WebhookMessage, name, None)):
+            async def call_when_sent(*args, **kwargs):
+                return await getattr(await self.resolve(), name)(*args, **kwargs)
+            return call_when_sent
+        raise AttributeError(f"{name} is not available until the message is sent, await the message first")
+
+
+class SendCoalescer:
+    """Buffers consecutive sends and merges them into as few messages as discord's limits allow"""
+
+    def __init__(self, send: typing.Callable[..., typing.Awaitable[discord.Message]], window: float = 0.25):
+        self.send = send
+        self.window = window
+        self.content = []  # type: typing.List[str]
+        self.embeds = []  # type: typing.List[discord.Embed]
+        self.files = []  # type: typing.List[discord.File]
+        self.futures = []  # type: typing.List[asyncio.Future]
+        self.timer = None  # type: typing.Optional[asyncio.TimerHandle]
+        self.flush_task = None  # type: typing.Optional[asyncio.Future]  # flush started by the timer
+        self.lock = asyncio.Lock()
+        self.merged = 0
+
+    @staticmethod
+    def can_coalesce(kwargs: typing.Dict[str, typing.Any]) -> bool:
+        return all(k in COALESCABLE_SEND_KWARGS for k in kwargs.keys())
+
+    def fits(self, content: typing.Optional[str], embeds: list, files: list) -> bool:
+        length = sum(len(c) + 1 for c in self.content) + (len(content) if content is not None else 0)
+        return length <= MAX_CONTENT_LENGTH and len(self.embeds) + len(embeds) <= MAX_EMBEDS and len(self.files) + len(files) <= MAX_FILES
+
+    async def add(self, kwargs: typing.Dict[str, typing.Any]) -> typing.Union[PendingMessage, discord.Message]:
+        content = kwargs.get("content", None)
+        content = str(content) if content is not None else None
+        embeds = [kwargs["embed"]] if kwargs.get("embed", None) is not None else list(kwargs.get("embeds", None) or [])
+        files = [kwargs["file"]] if kwargs.get("file", None) is not None else list(kwargs.get("files", None) or [])
+
+        # a message's content shows above its embeds and files, text sent after them has to start a new message
+        if content is not None and (self.embeds or self.files):
+            await self.flush()
+        if not self.fits(content, embeds, files):
+            await self.flush()
+            if not self.fits(content, embeds, files):
+                return await self.send(**kwargs)  # too big to merge with anything
+
+        if content is not None:
+            self.content.append(content)
+        self.embeds.extend(embeds)
+        self.files.extend(files)
+        future = asyncio.get_event_loop().create_future()
+        self.futures.append(future)
+        if self.timer is None:
+            self.timer = asyncio.get_event_loop().call_later(self.window, self._flush_later)
+        return PendingMessage(self, future)
+
+    def _flush_later(self) -> None:
+        self.flush_task = asyncio.ensure_future(self._flush())
+        self.flush_task.add_done_callback(self._flushed)
+
+    def _flushed(self, task: asyncio.Future) -> None:
+        if self.flush_task is task:
+            self.flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            # the buffered sends' handles carry the error too, but nobody may be awaiting them
+            log.warning(f"Sending coalesced messages failed: {type(task.exception()).__name__}: {task.exception()}")
+
+    async def flush(self) -> None:
+        if self.flush_task is not None:
+            await asyncio.wait([self.flush_task])  # its error is logged and set on its handles, not raised again here
+        await self._flush()
+
+    async def _flush(self) -> None:
+        async with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.futures:
+                return
+            kwargs = {}
+            if self.content:
+                kwargs["content"] = "\n".join(self.content)
+            if self.embeds:
+                kwargs["embeds"] = self.embeds
+            if self.files:
+                kwargs["files"] = self.files
+            futures = self.futures
+            self.content, self.embeds, self.files, self.futures = [], [], [], []
+            self.merged += len(futures) - 1
+
+            try:
+                msg = await self.send(**kwargs)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                    future.exception()  # mark as retrieved, callers may never await their handles
+                raise
+            for future in futures:
+                future.set_result(msg)
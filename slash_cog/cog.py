@@ -21,31 +21,90 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import asyncio
 import logging
+import time
 import typing
 from datetime import datetime
 
 import discord
-from discord.app_commands import AppCommandError, CommandNotFound
+from discord.app_commands import AppCommandError, Choice, CommandNotFound
 from discord.ext import commands
-from discord.ext.commands.hybrid import HybridCommand, HybridGroup
+from discord.ext.commands.view import StringView
 from discord.http import Route
-from discord.types.member import Member as MemberPayload
-from discord.types.user import User as UserPayload
 
-from . import command_map
-from .api_constants import ApplicationCommandType
-from .context import InteractContext
-from .message import InteractMessage
+from . import bulk, command_map, coordination, dispatch, ledger, manifest, permissions, resolvers, sync
+from .capture import InteractionRecorder
+from .followups import FollowupScheduler
+from .scheduler import InvocationScheduler
+from .metrics import Metrics
+from .offload import OffloadPools
+from .api_constants import ApplicationCommandOptionType, ApplicationCommandType
+from .autocomplete import MAX_CHOICE_NAME, PrefixIndex
+from .context import InteractContext, defer_pending
+from .decorator import get_extra_data
+from .message import PartialInteractMessage
 
 
 class SlashCommands(commands.Cog):
-    # TODO: Map commands / subcommand parsing => callback with conversion support to prevent hackily faking a message
     SLASH_INVOKE_PREFIX = "/"
+    # bind interaction options straight to the command callback instead of faking a message to be re-parsed
+    DIRECT_DISPATCH = False
+    # respond inline when commands reply quickly, deferring only if nothing was sent within DEFER_BUDGET seconds.
+    # per command, @slash_cog.defer("eager") / @slash_cog.defer("adaptive") overrides this
+    ADAPTIVE_DEFER = False
+    DEFER_BUDGET = 2.0  # discord requires a response within 3 seconds
+    # buffer consecutive ctx.send calls for COALESCE_WINDOW seconds and merge them into as few messages as possible,
+    # per command, @slash_cog.coalesce() / @slash_cog.coalesce(False) overrides this
+    COALESCE_SENDS = False
+    COALESCE_WINDOW = 0.25
+    # queue followups per interaction token, paced at FOLLOWUP_RATE sends per FOLLOWUP_PER seconds
+    SCHEDULE_FOLLOWUPS = False
+    FOLLOWUP_RATE = 5
+    FOLLOWUP_PER = 2.0
+    FOLLOWUP_MAX_QUEUE = 1000
+    # path to a json file remembering what was registered where, unchanged command maps are then not re-sent
+    LEDGER_PATH = None  # type: typing.Optional[str]
+    # only create/edit/delete the commands that differ from what discord has instead of overwriting the whole list
+    DIFF_SYNC = False
+    # path to a json file caching the introspected command parameters between restarts
+    PARAMETER_CACHE_PATH = None  # type: typing.Optional[str]
+    # members that had to be fetched because the interaction didn't carry them
+    MEMBER_CACHE_SIZE = 4096
+    MEMBER_CACHE_TTL = 300.0
+    # channels that had to be fetched because they weren't in the payload or the gateway cache
+    CHANNEL_CACHE_SIZE = 1024
+    CHANNEL_CACHE_TTL = 300.0
+
+    CAPTURE_PATH = None  # type: typing.Optional[str]
+    CAPTURE_ANONYMIZE = False
+
+    COORDINATION_PATH = None  # type: typing.Optional[str]
+    COORDINATION_TIMEOUT = 120.0
+
+    SCHEDULE_INVOCATIONS = False
+    MAX_CONCURRENT_INVOCATIONS = 64
+    MAX_CONCURRENT_PER_GUILD = 8
+    MAX_CONCURRENT_PER_USER = 2
+    INVOCATION_QUEUE_SIZE = 1000
+    INVOCATION_QUEUE_TIMEOUT = 2.0  # has to leave enough of discord's 3 seconds to send BUSY_MESSAGE
+    BUSY_MESSAGE = "\N{HOURGLASS} I'm busy right now, please try again in a moment"
+
+    MANIFEST_PATH = None  # type: typing.Optional[str]  # built with `python -m slash_cog build`
+
+    # workers for ctx.run_blocking, None picks python's defaults (cpu count + 4 threads, capped at 32, and cpu count processes)
+    OFFLOAD_THREADS = None  # type: typing.Optional[int]
+    OFFLOAD_PROCESSES = None  # type: typing.Optional[int]
+
+    # endpoints passed to watch_endpoint() are re-registered once no cog or extension was (re)loaded for this long
+    RELOAD_DEBOUNCE = 2.0
 
     def __init__(self, bot: commands.Bot):
         self.registered = set()
         self.bot = bot
+        self.ledger = ledger.RegistrationLedger(self.LEDGER_PATH) if self.LEDGER_PATH is not None else None
+        if self.ledger is not None and self.bot.application_id is not None:
+            self.registered.update(self.ledger.endpoints(self.bot.application_id))
         self.orig_prefix_callback = bot.get_prefix
         bot.get_prefix = self.get_prefix_wrapper
 
@@ -55,9 +114,141 @@ class SlashCommands(commands.Cog):
         self.orig_err_handler = self.bot.tree.on_error
         self.bot.tree.on_error = self.attempt_handle_tree_error
 
+        if self.PARAMETER_CACHE_PATH is not None:
+            command_map.parameter_cache.load(self.PARAMETER_CACHE_PATH)
+        self.manifest = None  # type: typing.Optional[manifest.CommandManifest]
+        if self.MANIFEST_PATH is not None:
+            try:
+                self.manifest = manifest.CommandManifest.load(self.MANIFEST_PATH)
+            except (FileNotFoundError, ValueError) as e:
+                self.logger.warning(f"Ignoring command manifest {self.MANIFEST_PATH}: {e}")
+            else:
+                command_map.parameter_cache.preload(self.manifest.parameters)
+
+        self.metrics = Metrics()
+        self.members = resolvers.MemberResolver(self.MEMBER_CACHE_SIZE, self.MEMBER_CACHE_TTL, self.metrics)
+        self.channels = resolvers.ChannelResolver(bot, self.CHANNEL_CACHE_SIZE, self.CHANNEL_CACHE_TTL, self.metrics)
+        self.followups = None  # type: typing.Optional[FollowupScheduler]
+        if self.SCHEDULE_FOLLOWUPS:
+            self.followups = FollowupScheduler(self.FOLLOWUP_RATE, self.FOLLOWUP_PER, self.FOLLOWUP_MAX_QUEUE)
+        self.pools = OffloadPools(self.OFFLOAD_THREADS, self.OFFLOAD_PROCESSES, self.metrics)
+        self.scheduler = None  # type: typing.Optional[InvocationScheduler]
+        if self.SCHEDULE_INVOCATIONS:
+            self.scheduler = InvocationScheduler(
+                self.MAX_CONCURRENT_INVOCATIONS, self.MAX_CONCURRENT_PER_GUILD, self.MAX_CONCURRENT_PER_USER,
+                self.INVOCATION_QUEUE_SIZE, self.metrics
+            )
+        self.coordination = None  # type: typing.Optional[coordination.CoordinationBackend]
+        if self.COORDINATION_PATH is not None:
+            self.coordination = coordination.FileLockBackend(self.COORDINATION_PATH)
+        self.recorder = None  # type: typing.Optional[InteractionRecorder]
+        if self.CAPTURE_PATH is not None:
+            self.start_capture(self.CAPTURE_PATH, self.CAPTURE_ANONYMIZE)
+        self.dispatch_index = dispatch.DispatchIndex()
+        self.choice_sources = {}  # type: typing.Dict[str, PrefixIndex]
+        self.guild_aliases = {}  # type: typing.Dict[int, typing.Dict[str, str]]  # guild ID -> {registered name: command name}
+        self.indexed = {}  # type: typing.Dict[str, typing.Tuple[commands.Command, typing.Optional[dict]]]
+        self.command_owners = {}  # type: typing.Dict[str, str]  # command name -> cog or extension
+        self.watched_endpoints = {}  # type: typing.Dict[str, typing.Optional[typing.Callable[[commands.Command], bool]]]
+        self.pending_endpoints = {}  # type: typing.Dict[str, typing.Set[str]]  # endpoint -> cogs and extensions that changed
+        self.reregister_timer = None  # type: typing.Optional[asyncio.TimerHandle]
+        self.reregister_task = None  # type: typing.Optional[asyncio.Future]
+        self.reregister_lock = asyncio.Lock()
+        for cmd in bot.commands:
+            self.command_owners[cmd.name] = self.command_owner(cmd)
+        self.orig_add_command = bot.add_command
+        self.orig_remove_command = bot.remove_command
+        bot.add_command = self.add_command_wrapper
+        bot.remove_command = self.remove_command_wrapper
+
     def cog_unload(self):
         self.bot.get_prefix = self.orig_prefix_callback
         self.bot.tree.on_error = self.orig_err_handler
+        self.bot.add_command = self.orig_add_command
+        self.bot.remove_command = self.orig_remove_command
+        if self.reregister_timer is not None:
+            self.reregister_timer.cancel()
+        if self.reregister_task is not None:
+            self.reregister_task.cancel()
+        self.pools.shutdown()
+        self.stop_capture()
+
+    def start_capture(self, path: str, anonymize: bool = False) -> None:
+        self.stop_capture()
+        self.recorder = InteractionRecorder(path, anonymize)
+        self.logger.info(f"Capturing interactions to {path}")
+
+    def stop_capture(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.logger.info(f"Captured {self.recorder.count} interactions to {self.recorder.path}")
+            self.recorder = None
+
+    @staticmethod
+    def command_owner(cmd: commands.Command) -> str:
+        return cmd.cog.qualified_name if cmd.cog is not None else cmd.module
+
+    def commands_of(self, owner: str) -> typing.List[commands.Command]:
+        """Top-level commands added by a cog (by its qualified name) or a cog-less extension (by its module)"""
+        return [cmd for cmd in self.bot.commands if self.command_owners.get(cmd.name, None) == owner]
+
+    # cogs inject and eject their commands through bot.add_command/remove_command, so these see every cog and extension
+    def add_command_wrapper(self, command: commands.Command) -> None:
+        self.orig_add_command(command)
+        self.dispatch_index.invalidate()
+        self.indexed.pop(command.name, None)
+        self.command_owners[command.name] = self.command_owner(command)
+        self.schedule_reregistration(command)
+
+    def remove_command_wrapper(self, name: str) -> typing.Optional[commands.Command]:
+        cmd = self.orig_remove_command(name)
+        self.dispatch_index.invalidate()
+        if cmd is not None:
+            # the extension is being unloaded or reloaded, drop what was introspected from its callbacks
+            for sub_cmd in [cmd, *cmd.walk_commands()] if isinstance(cmd, commands.Group) else [cmd]:
+                command_map.parameter_cache.invalidate(sub_cmd.callback)
+            self.indexed.pop(cmd.name, None)
+            self.schedule_reregistration(cmd)
+            self.command_owners.pop(cmd.name, None)
+        return cmd
+
+    def watch_endpoint(self, endpoint: str, check: typing.Callable[[commands.Command], bool] = None) -> None:
+        """Re-registers the endpoint's commands (the ones passing check) after a burst of cog or extension reloads"""
+        self.watched_endpoints[endpoint] = check
+
+    def unwatch_endpoint(self, endpoint: str) -> None:
+        self.watched_endpoints.pop(endpoint, None)
+        self.pending_endpoints.pop(endpoint, None)
+
+    def schedule_reregistration(self, cmd: commands.Command) -> None:
+        # extensions loaded at startup are registered by whoever registers the commands once the bot is ready
+        if not self.bot.is_ready():
+            return
+        owner = self.command_owners.get(cmd.name, None) or self.command_owner(cmd)
+        for endpoint, check in self.watched_endpoints.items():
+            if check is None or check(cmd):
+                self.pending_endpoints.setdefault(endpoint, set()).add(owner)
+        if not self.pending_endpoints:
+            return
+        if self.reregister_timer is not None:
+            self.reregister_timer.cancel()
+        self.reregister_timer = self.bot.loop.call_later(self.RELOAD_DEBOUNCE, self._start_reregistration)
+
+    def _start_reregistration(self) -> None:
+        self.reregister_timer = None
+        self.reregister_task = asyncio.ensure_future(self.reregister_pending())
+
+    async def reregister_pending(self) -> None:
+        async with self.reregister_lock:
+            pending, self.pending_endpoints = self.pending_endpoints, {}
+            for endpoint, owners in pending.items():
+                check = self.watched_endpoints.get(endpoint, None)
+                _commands = {cmd for cmd in self.bot.commands if check is None or check(cmd)}
+                self.logger.info(f"Re-registering commands to {endpoint} after changes to {', '.join(sorted(owners))}")
+                try:
+                    await self.register_commands(endpoint, await self.generate_command_map(_commands))
+                except Exception as e:
+                    self.logger.error(f"Re-registering commands to {endpoint} failed: {type(e).__name__}: {e}")
 
     async def attempt_handle_tree_error(self, interaction: discord.Interaction, error: AppCommandError) -> None:
         if isinstance(error, CommandNotFound) and self.bot.get_command(error.name) is not None:
@@ -65,48 +256,173 @@ class SlashCommands(commands.Cog):
         await self.orig_err_handler(interaction, error)
 
     async def get_prefix_wrapper(self, msg: discord.Message) -> typing.Union[list, str]:
-        from .message import InteractMessage
-
-        if not isinstance(msg, InteractMessage):
+        if not isinstance(msg, PartialInteractMessage):
             return await self.orig_prefix_callback(msg)
         return f"{self.SLASH_INVOKE_PREFIX}"
 
     async def generate_command_map(self, _commands: typing.Set[commands.Command] = None) -> typing.List[typing.Dict]:
         if _commands is None:
             _commands = self.bot.commands
+        if self.dispatch_index.stale:
+            self.dispatch_index.build(self.bot.commands)
 
-        cmd_map = []
+        indexed = []
+        stale = []
         for cmd in _commands:
-            cmd_data = await command_map.index_command(self.logger, self.bot, cmd)
-            if cmd_data is None:
+            # only commands added since they were last indexed (by a cog or extension reload) are indexed again
+            cached = self.indexed.get(cmd.name, None)
+            if cached is not None and cached[0] is cmd:
+                indexed.append(cached[1])
                 continue
-            cmd_map.append(cmd_data)
+            entry = self.manifest.lookup(cmd) if self.manifest is not None else None
+            if entry is None:
+                stale.append(cmd)
+            else:
+                indexed.append(self.manifest.payload(entry))
+                self.indexed[cmd.name] = (cmd, indexed[-1])
+        if self.manifest is not None and stale:
+            self.logger.warning(f"Command manifest is stale for {', '.join(c.name for c in stale)}, "
+                                f"rebuild it with `python -m slash_cog build`")
+
+        payloads = await asyncio.gather(*(command_map.index_command(self.logger, self.bot, cmd) for cmd in stale))
+        for cmd, cmd_data in zip(stale, payloads):
+            self.indexed[cmd.name] = (cmd, cmd_data)
+        indexed.extend(payloads)
+        cmd_map = [cmd_data for cmd_data in indexed if cmd_data is not None]
+        command_map.parameter_cache.save()
         return cmd_map
 
-    async def register_commands(self, endpoint: str = "/", cmd_list: list = None) -> None:
+    def invalidate_owner_ids(self) -> None:
+        command_map.owner_id_resolver.invalidate()
+        self.indexed.clear()
+
+    async def register_commands(self, endpoint: str = "/", cmd_list: list = None, force: bool = False, verify: bool = False) -> bool:
         if cmd_list is None:
             cmd_list = await self.generate_command_map()
 
+        digest = ledger.hash_command_map(cmd_list)
+        if not force and self.ledger is not None and self.ledger.get_digest(self.bot.application_id, endpoint) == digest:
+            if not verify or await self.verify_registration(endpoint, cmd_list):
+                self.registered.add(endpoint)
+                self.logger.info(f"Commands for {endpoint} are unchanged, skipping registration")
+                return False
+            self.logger.warning(f"Registered commands for {endpoint} don't match the ledger, re-registering...")
+
+        if self.DIFF_SYNC:
+            # nothing was sent when discord already had the same commands
+            return not (await self.sync_commands(endpoint, cmd_list)).empty
+
         self.logger.debug("Sending command list...")
         await self.__internal_ep_req("PUT", endpoint, cmd_list)
         self.registered.add(endpoint)
+        if self.ledger is not None:
+            self.ledger.record(self.bot.application_id, endpoint, digest, len(cmd_list))
         self.logger.info(f"Registered {len(cmd_list)} top-level commands to {endpoint} !")
+        return True
 
-        # todo: permissions v2, https://discord.com/developers/docs/interactions/application-commands#application-command-permissions-object-example-of-editing-permissions
+    async def register_coordinated(self, endpoint: str = "/", _commands: typing.Set[commands.Command] = None,
+                                   force: bool = False) -> typing.List[dict]:
+        if _commands is None:
+            _commands = self.bot.commands
+        if self.coordination is None:
+            cmd_list = await self.generate_command_map(_commands)
+            await self.register_commands(endpoint, cmd_list, force)
+            return cmd_list
+
+        key = f"{self.bot.application_id}{endpoint}"
+        fingerprint = command_map.commands_fingerprint(_commands)
+        # one registrar per application at a time, whoever comes after it reuses what it published
+        async with self.coordination.lock(f"registrar-{self.bot.application_id}", self.COORDINATION_TIMEOUT):
+            published = self.coordination.fetch(key)
+            if not force and published is not None and published["fingerprint"] == fingerprint:
+                self.registered.add(endpoint)
+                self.logger.info(f"Commands for {endpoint} were already registered by another process, reusing its command map")
+                return published["commands"]
+
+            cmd_list = await self.generate_command_map(_commands)
+            await self.register_commands(endpoint, cmd_list, force)
+            self.coordination.publish(key, {
+                "fingerprint": fingerprint,
+                "commands": cmd_list,
+                "published_at": datetime.isoformat(datetime.utcnow()),
+            })
+            return cmd_list
+
+    async def register_guilds(self, overlays: typing.Dict[int, typing.Optional[bulk.GuildOverlay]], base: typing.List[dict] = None,
+                              concurrency: int = 4, retries: int = 3, progress: bulk.ProgressCallback = None,
+                              force: bool = False) -> bulk.BulkResult:
+        """Registers the base command map (by default every command but the overlays' extras) with each guild's overlay
+        applied, a few guilds at a time"""
+        extra = list({cmd for overlay in overlays.values() if overlay is not None for cmd in overlay.extra})
+        if base is None:
+            extra_names = {cmd.name for cmd in extra}
+            base = await self.generate_command_map({cmd for cmd in self.bot.commands if cmd.name not in extra_names})
+        indexed = await asyncio.gather(*(command_map.index_command(self.logger, self.bot, cmd, include_hidden=True) for cmd in extra))
+        extra_payloads = dict(zip(extra, indexed))
+
+        result = bulk.BulkResult()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def register(guild_id: int, overlay: typing.Optional[bulk.GuildOverlay]) -> None:
+            cmd_list = overlay.apply(base, extra_payloads) if overlay is not None else base
+            error = None
+            for attempt in range(retries + 1):
+                try:
+                    async with limit:
+                        sent = await self.register_commands(f"/guilds/{guild_id}", cmd_list, force)
+                except Exception as e:
+                    error = e
+                    if attempt >= retries or not bulk.is_retryable(e):
+                        break
+                    delay = bulk.retry_delay(e, attempt)
+                    self.logger.warning(f"Registering commands to guild {guild_id} failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                else:
+                    error = None
+                    (result.registered if sent else result.unchanged).append(guild_id)
+                    break
+
+            if error is not None:
+                result.failed[guild_id] = error
+            elif overlay is not None and overlay.renamed:
+                self.guild_aliases[guild_id] = overlay.aliases()
+            else:
+                self.guild_aliases.pop(guild_id, None)
+            if progress is not None:
+                progress(len(result.registered) + len(result.unchanged) + len(result.failed), len(overlays), guild_id, error)
+
+        await asyncio.gather(*(register(guild_id, overlay) for guild_id, overlay in overlays.items()))
+        self.logger.info(f"Registered commands to {len(overlays)} guilds: {result.summary()}")
+        return result
+
+    async def sync_permissions(self, guild_ids: typing.Iterable[int], bearer_token: str, concurrency: int = 4) -> bulk.BulkResult:
+        """Translates is_owner/has_role/has_any_role into guild command permissions, only writing the ones that changed"""
+        result = await permissions.PermissionsSynchronizer(self.bot, self.logger, bearer_token).sync(guild_ids, concurrency)
+        self.logger.info(f"Synced command permissions: {result.summary()}")
+        return result
+
+    async def sync_commands(self, endpoint: str = "/", cmd_list: list = None) -> sync.SyncPlan:
+        if cmd_list is None:
+            cmd_list = await self.generate_command_map()
+
+        remote = await self.__internal_ep_req("GET", endpoint)
+        plan = sync.diff_commands(remote, cmd_list)
+        for cmd_data in plan.create:
+            await self.__internal_ep_req("POST", endpoint, cmd_data)
+        for cmd_id, cmd_data in plan.edit:
+            await self.__internal_ep_req("PATCH", endpoint, cmd_data, suffix=f"/{cmd_id}")
+        for cmd_id, _ in plan.delete:
+            await self.__internal_ep_req("DELETE", endpoint, suffix=f"/{cmd_id}")
 
-        # types:
-        #   ROLE: 1
-        #   USER: 1
-        #   CHANNEL: 1
+        self.registered.add(endpoint)
+        if self.ledger is not None:
+            self.ledger.record(self.bot.application_id, endpoint, ledger.hash_command_map(cmd_list), len(cmd_list))
+        self.logger.info(f"Synced {len(cmd_list)} top-level commands to {endpoint} ({plan.summary()})")
+        return plan
 
-        # sample code:
-        # await self.__internal_ep_req("PUT", "/guilds/<my_guild_id>", suffix="/<my_command_id>/permissions", data={
-        #     "permissions": [{
-        #         "id": channel_id,
-        #         "type": 3,
-        #         "permission": False
-        #     }]
-        # })
+    async def verify_registration(self, endpoint: str, cmd_list: typing.List[dict]) -> bool:
+        remote = await self.__internal_ep_req("GET", endpoint)
+        return sync.diff_commands(remote, cmd_list).empty
 
     async def unregister_commands(self, endpoint: str) -> None:
         self.logger.info(f"Unregistering commands ({endpoint})...")
@@ -116,9 +432,15 @@ class SlashCommands(commands.Cog):
             self.registered.remove(endpoint)
         except KeyError:
             pass
+        if self.ledger is not None:
+            self.ledger.forget(self.bot.application_id, endpoint)
+        if self.coordination is not None:
+            self.coordination.unpublish(f"{self.bot.application_id}{endpoint}")
 
     async def clear_commands(self) -> None:
-        for endpoint in self.registered:
+        if self.ledger is not None:
+            self.registered.update(self.ledger.endpoints(self.bot.application_id))
+        for endpoint in list(self.registered):
             await self.unregister_commands(endpoint)
 
     async def __internal_ep_req(self, method: str, endpoint: str, data: typing.Any = None, suffix: str = "") -> typing.Any:
@@ -135,61 +457,170 @@ class SlashCommands(commands.Cog):
             return
         if data["type"] != ApplicationCommandType.CHAT_INPUT:
             return
-        if any(_.get("focused", False) for _ in data.get("options", [])):
-            return  # ignore autocomplete
-        cmd = self.bot.get_command(data["name"])
-        if cmd is None or isinstance(cmd, (HybridCommand, HybridGroup)):
+        started = time.perf_counter()
+        if self.recorder is None:
+            return await self.process_interaction(interaction, started)
+        try:
+            await self.process_interaction(interaction, started)
+        finally:
+            if self.recorder is not None:
+                self.recorder.record(interaction, started, time.perf_counter() - started)
+
+    async def process_interaction(self, interaction: discord.Interaction, started: float):
+        data = interaction.data
+        if self.dispatch_index.stale:
+            self.dispatch_index.build(self.bot.commands)
+        plan, options, focused = self.dispatch_index.resolve(data, self.guild_aliases.get(interaction.guild_id, None))
+        if plan is None:
             return
+        if focused is not None:
+            return await self.handle_autocomplete(interaction, plan, options, focused)
+
+        if self.scheduler is None:
+            return await self.invoke_interaction(interaction, started, plan, options)
+        # DMs are queued per user, as their own "guild"
+        guild = interaction.guild_id if interaction.guild_id is not None else f"dm-{interaction.user.id}"
+        timeout = self.INVOCATION_QUEUE_TIMEOUT - (time.perf_counter() - started)
+        if not await self.scheduler.acquire(guild, interaction.user.id, timeout):
+            return await interaction.response.send_message(self.BUSY_MESSAGE, ephemeral=True)
+        try:
+            await self.invoke_interaction(interaction, started, plan, options)
+        finally:
+            self.scheduler.release(guild, interaction.user.id)
+
+    async def invoke_interaction(self, interaction: discord.Interaction, started: float, plan: dispatch.CommandPlan,
+                                 options: typing.Dict[str, dict]):
+        stage = self.metrics.timer
 
         try:
-            ch = self.bot.get_channel(interaction.channel.id) or await self.bot.fetch_channel(interaction.channel.id)
+            with stage("interaction_stage_seconds", stage="channel"):
+                ch = await self.channels.resolve(interaction)
         except discord.HTTPException:
             return await interaction.response.send_message(
                 "\N{WARNING SIGN} I cannot access the current channel you are on, please check permissions", ephemeral=True
             )
-        if not isinstance(ch, (discord.TextChannel, discord.Thread, discord.DMChannel, discord.GroupChannel, discord.PartialMessageable)):
+        if not isinstance(ch, resolvers.MESSAGEABLE_CHANNEL_TYPES):
             return
 
-        if not ch.permissions_for(ch.guild.me if ch.guild is not None else self.bot.user).read_messages:
+        if not self.channels.can_read(interaction, ch):
             # somehow replying is possible even without perms based on my tests, cuz interactions use webhooks instead of actual channel messages,
             # but this might be unwanted behavior.
             return await interaction.response.send_message(
                 "\N{WARNING SIGN} I cannot access the current channel you are on, please check permissions", ephemeral=True
             )
 
-        args = []
-        for opt in data.get("options", []):
-            if opt.get("type", None) == ApplicationCommandType.CHAT_INPUT:
-                args.append(opt["name"])
-                for sub_opt in opt.get("options", []):  # type: dict
-                    args.append(sub_opt["value"])
+        mode = self.defer_mode(plan.command)
+        response_lock = asyncio.Lock()
+        timer = None
+        deferring = []  # type: typing.List[asyncio.Future]  # the defer started by the timer, awaited when done
+        if mode == "eager":
+            with stage("interaction_stage_seconds", stage="defer"):
+                await interaction.response.defer()
+        else:
+            # run the command straight away, only defer if it hasn't responded by the time the budget runs out,
+            # counted from when the interaction came in as it may have been queued by the scheduler
+            budget = max(0.0, self.DEFER_BUDGET - (time.perf_counter() - started))
+            timer = self.bot.loop.call_later(budget, lambda: deferring.append(asyncio.ensure_future(defer_pending(interaction, response_lock))))
+
+        ctx = None
+        try:
+            with stage("interaction_stage_seconds", stage="context"):
+                if self.DIRECT_DISPATCH:
+                    ctx = await self.get_direct_context(interaction, ch, plan)
+                else:
+                    ctx = await self.get_legacy_context(interaction, ch, plan, options)
+                ctx.response_lock = response_lock
+                ctx.followups = self.followups
+                ctx.pools = self.pools
+                ctx.offload_pool = get_extra_data(plan.command, "offload", "thread")
+                if get_extra_data(plan.command, "coalesce", self.COALESCE_SENDS):
+                    ctx.enable_coalescing(self.COALESCE_WINDOW)
+            with stage("interaction_stage_seconds", stage="invoke"):
+                if self.DIRECT_DISPATCH:
+                    await dispatch.invoke_direct(self.bot, ctx, plan, options)
+                else:
+                    await self.bot.invoke(ctx)
+        finally:
+            with stage("interaction_stage_seconds", stage="finish"):
+                if ctx is not None:
+                    try:
+                        await ctx.flush()
+                    except Exception as e:
+                        # the buffered sends' handles carry the error, the rest of the cleanup still has to run
+                        self.logger.warning(f"Sending coalesced messages for {plan.command.qualified_name} failed: {type(e).__name__}: {e}")
+                if timer is not None:
+                    timer.cancel()
+                    for task in deferring:
+                        try:
+                            await task
+                        except discord.HTTPException as e:
+                            self.logger.warning(f"Deferring {plan.command.qualified_name} failed: {type(e).__name__}: {e}")
+                    await defer_pending(interaction, response_lock)
+            self.metrics.observe("command_seconds", time.perf_counter() - started, command=plan.command.qualified_name)
+
+    def add_choice_source(self, name: str, choices: typing.Iterable = ()) -> PrefixIndex:
+        """Registers (or replaces) an autocomplete source, update it later through the returned index"""
+        source = self.choice_sources[name] = PrefixIndex(choices)
+        return source
+
+    def get_choice_source(self, name: str) -> typing.Optional[PrefixIndex]:
+        return self.choice_sources.get(name, None)
+
+    async def handle_autocomplete(self, interaction: discord.Interaction, plan: dispatch.CommandPlan, options: typing.Dict[str, dict],
+                                  focused: str) -> None:
+        with self.metrics.timer("autocomplete_seconds", command=plan.command.qualified_name):
+            source = get_extra_data(plan.command, "autocomplete", {}).get(focused, None)
+            if isinstance(source, str):
+                source = self.choice_sources.get(source, None)
+            choices = source.search(str(options[focused].get("value", ""))) if source is not None else []
+            await interaction.response.autocomplete([Choice(name=name[:MAX_CHOICE_NAME], value=value) for name, value in choices])
+
+    def defer_mode(self, cmd: commands.Command) -> str:
+        # offloaded commands are expected to be slow, there's no point waiting for them to reply in time
+        if get_extra_data(cmd, "offload", None) is not None:
+            return get_extra_data(cmd, "defer", None) or "eager"
+        return get_extra_data(cmd, "defer", None) or ("adaptive" if self.ADAPTIVE_DEFER else "eager")
+
+    async def get_legacy_context(self, interaction: discord.Interaction, ch: discord.abc.Messageable, plan: dispatch.CommandPlan,
+                                 options: typing.Dict[str, dict]) -> InteractContext:
+        args = list(plan.path[1:])
+        attachments = []
+        mentions = []
+        resolved = (interaction.data or {}).get("resolved", {})
+        for opt_name in plan.option_order:
+            if opt_name not in options:
+                continue
+            opt = options[opt_name]
+            value = str(opt["value"])
+            if opt["type"] == ApplicationCommandOptionType.ATTACHMENT:
+                # discord.py hands attachment parameters the message's attachments in order, they don't take a word
+                attachments.append(resolved["attachments"][value])
                 continue
+            if opt["type"] in (ApplicationCommandOptionType.USER, ApplicationCommandOptionType.MENTIONABLE) and value in resolved.get("users", {}):
+                # user/member converters look through the message's mentions before doing any lookups
+                mention = dict(resolved["users"][value])
+                if value in resolved.get("members", {}):
+                    mention["member"] = dict(resolved["members"][value])
+                mentions.append(mention)
+            if opt["type"] in (ApplicationCommandOptionType.ROLE, ApplicationCommandOptionType.MENTIONABLE) and value in resolved.get("roles", {}):
+                # the role converter only looks at the guild's cache, resolved roles are complete so they can go there
+                guild = interaction.guild
+                if guild is not None and guild.get_role(int(value)) is None:
+                    guild._add_role(discord.Role(guild=guild, state=self.bot._connection, data=resolved["roles"][value]))
             args.append(opt["value"])
 
-        user = interaction.user
-
-        await interaction.response.defer()
-
-        now_datestr = datetime.isoformat(datetime.utcnow())
         # fake message, invoke a command as the user
-        _data = {
-            "content": f"{self.SLASH_INVOKE_PREFIX}{data['name']} {' '.join(map(str, args))}".strip(),
-            "author": UserPayload(id=user.id, username=user.name, discriminator=user.discriminator, avatar=None),
-            "id": 0,
-            "attachments": [],
-            "embeds": [],
-            "edited_timestamp": now_datestr,
-            "type": discord.MessageType.default,
-            "pinned": False,
-            "mention_everyone": False,
-            "tts": False,
-        }
-        if interaction.guild is not None:
-            _data["member"] = MemberPayload(
-                roles=[role.id for role in (interaction.guild.get_member(user.id) or await interaction.guild.fetch_member(user.id)).roles],
-                premium_since=None, pending=False, mute=False, joined_at=now_datestr, deaf=False,
-                nick=None, communication_disabled_until=None, avatar=None
-            )
-
-        ctx = await self.bot.get_context(InteractMessage(channel=ch, data=_data, state=self.bot._connection, parent_interaction=interaction), cls=InteractContext)
-        await self.bot.invoke(ctx)
+        msg = PartialInteractMessage(
+            state=self.bot._connection, channel=ch, parent_interaction=interaction,
+            content=f"{self.SLASH_INVOKE_PREFIX}{plan.path[0]} {' '.join(map(str, args))}".strip(),
+            author=await self.members.resolve(interaction), mentions=mentions, attachments=attachments,
+        )
+        return await self.bot.get_context(msg, cls=InteractContext)
+
+    async def get_direct_context(self, interaction: discord.Interaction, ch: discord.abc.Messageable, plan: dispatch.CommandPlan) -> InteractContext:
+        msg = PartialInteractMessage(
+            state=self.bot._connection, channel=ch, parent_interaction=interaction, author=await self.members.resolve(interaction)
+        )
+        return InteractContext(
+            message=msg, bot=self.bot, view=StringView(""), prefix=self.SLASH_INVOKE_PREFIX, invoked_with=plan.path[0]
+        )
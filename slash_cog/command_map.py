@@ -22,39 +22,169 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import asyncio
+import hashlib
 import inspect
+import json
+import os
 import typing
+import weakref
 from logging import Logger
 
 import discord
 from discord.ext import commands
-from docstring_parser import parse as parse_doc
 
 from .api_constants import *
+from .cache import SingleFlight, TTLCache
+from .decorator import get_extra_data
+
+
+USER_ANNOTATIONS = (discord.user.User, discord.Member, discord.abc.User)
+# bump whenever the options derived from a callback change, so persisted parameter caches get rebuilt
+INDEX_VERSION = 3
 
 
 def param_annotation_to_discord_int(annotation: type) -> ApplicationCommandOptionType:
+    union_args = [arg for arg in getattr(annotation, "__args__", ()) if arg is not type(None)]
+    if getattr(annotation, "__origin__", None) is typing.Union and union_args:
+        if len(union_args) == 1:  # Optional[X]
+            return param_annotation_to_discord_int(union_args[0])
+        users = [arg for arg in union_args if arg in USER_ANNOTATIONS]
+        if len(users) == len(union_args):  # Union[discord.Member, discord.User]
+            return ApplicationCommandOptionType.USER
+        if users and all(arg in USER_ANNOTATIONS or arg == discord.Role for arg in union_args):
+            return ApplicationCommandOptionType.MENTIONABLE
+        if all(isinstance(arg, type) and issubclass(arg, (discord.abc.GuildChannel, discord.Thread)) for arg in union_args):
+            return ApplicationCommandOptionType.CHANNEL
+
     if annotation == str or annotation == commands.clean_content:
         return ApplicationCommandOptionType.STRING
     elif annotation == int:
         return ApplicationCommandOptionType.INTEGER
     elif annotation == bool:
         return ApplicationCommandOptionType.BOOLEAN
-    elif annotation == discord.user.User:
+    elif annotation in USER_ANNOTATIONS:
         return ApplicationCommandOptionType.USER
-    elif annotation == discord.abc.GuildChannel:
+    elif isinstance(annotation, type) and issubclass(annotation, (discord.abc.GuildChannel, discord.Thread)):
         return ApplicationCommandOptionType.CHANNEL
     elif annotation == discord.Role:
         return ApplicationCommandOptionType.ROLE
-    # elif False:
-    #     return ApplicationCommandOptionType.MENTIONABLE
     elif annotation == float:
         return ApplicationCommandOptionType.NUMBER
+    elif annotation == discord.Attachment:
+        return ApplicationCommandOptionType.ATTACHMENT
 
     return ApplicationCommandOptionType.STRING  # fallback to string, discord.py will convert it
 
 
+def callback_fingerprint(callback: callable) -> str:
+    # everything index_callback_parameters derives the options from, stable across processes
+    fn = inspect.unwrap(callback)
+    code = fn.__code__
+    h = hashlib.sha1()
+    for part in (
+        INDEX_VERSION, fn.__module__, fn.__qualname__, code.co_code, code.co_varnames, code.co_argcount, code.co_kwonlyargcount, code.co_flags,
+        fn.__defaults__, fn.__kwdefaults__, getattr(fn, "__annotations__", None), callback.__doc__,
+    ):
+        h.update(repr(part).encode("utf-8") if not isinstance(part, bytes) else part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def commands_fingerprint(cmds: typing.Iterable[commands.Command]) -> str:
+    # everything index_command reads from the commands themselves, cheap enough to check before generating the map
+    flat = []
+    for cmd in cmds:
+        flat.append(cmd)
+        if isinstance(cmd, commands.Group):
+            flat.extend(cmd.walk_commands())
+    h = hashlib.sha1()
+    for cmd in sorted(flat, key=lambda c: c.qualified_name):
+        extras = [check.__dict__.get("slash_extras", None) for check in cmd.checks]
+        autocompleted = sorted(get_extra_data(cmd, "autocomplete", {}).keys())
+        for part in (cmd.qualified_name, cmd.hidden, cmd.description, cmd.help, callback_fingerprint(cmd.callback), extras, autocompleted):
+            h.update(repr(part).encode("utf-8"))
+            h.update(b"\0")
+    return h.hexdigest()
+
+
+class ParameterCache:
+    """Memoizes index_callback_parameters per callback, optionally persisted to disk by fingerprint"""
+
+    def __init__(self):
+        self.entries = weakref.WeakKeyDictionary()  # type: typing.MutableMapping[callable, typing.Tuple[typing.Any, typing.List[dict]]]
+        self.store = {}  # type: typing.Dict[str, typing.List[dict]]
+        self.path = None  # type: typing.Optional[str]
+        self.dirty = False
+
+    def load(self, path: str) -> None:
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.store = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.store = {}
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.store, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def get(self, callback: callable) -> typing.Optional[typing.List[dict]]:
+        entry = self.entries.get(callback, None)
+        if entry is not None and entry[0] is inspect.unwrap(callback).__code__:
+            return entry[1]
+        if not self.store:
+            return None
+        options = self.store.get(callback_fingerprint(callback), None)
+        if options is not None:
+            self.entries[callback] = (inspect.unwrap(callback).__code__, options)
+        return options
+
+    def put(self, callback: callable, options: typing.List[dict]) -> None:
+        self.entries[callback] = (inspect.unwrap(callback).__code__, options)
+        if self.path is not None:
+            self.store[callback_fingerprint(callback)] = options
+            self.dirty = True
+
+    def preload(self, store: typing.Dict[str, typing.List[dict]]) -> None:
+        self.store.update(store)
+
+    def invalidate(self, callback: callable = None) -> None:
+        if callback is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(callback, None)
+
+
+parameter_cache = ParameterCache()
+
+
 def index_callback_parameters(log: Logger, callback: callable) -> typing.List[dict]:
+    cached = parameter_cache.get(callback)
+    if cached is None:
+        cached = compute_callback_parameters(log, callback)
+        parameter_cache.put(callback, cached)
+    return [dict(opt) for opt in cached]
+
+
+def command_options(log: Logger, cmd: commands.Command) -> typing.List[dict]:
+    options = index_callback_parameters(log, cmd.callback)
+    sources = get_extra_data(cmd, "autocomplete", None)
+    if sources:
+        for opt in options:
+            if opt["name"] in sources:
+                opt["autocomplete"] = True
+    return options
+
+
+def compute_callback_parameters(log: Logger, callback: callable) -> typing.List[dict]:
+    from docstring_parser import parse as parse_doc  # only needed when there's no cached or prebuilt entry
+
     options = []
     params = inspect.signature(callback).parameters  # type: typing.Mapping[str, inspect.Parameter]
     doc = parse_doc(callback.__doc__)
@@ -77,7 +207,32 @@ def index_callback_parameters(log: Logger, callback: callable) -> typing.List[di
     return options
 
 
+class OwnerIdResolver:
+    """Caches the bot owner IDs so owner-gated commands don't each cost an application_info() call"""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.cache = TTLCache(maxsize=16, ttl=ttl)
+        self.flight = SingleFlight()
+
+    async def resolve(self, bot: commands.Bot) -> typing.Set[int]:
+        ids = self.cache.get(id(bot), None)
+        if ids is None:
+            ids = await self.flight.do(id(bot), lambda: fetch_owner_ids(bot))
+            self.cache.set(id(bot), ids)
+        return ids
+
+    def invalidate(self) -> None:
+        self.cache.clear()
+
+
+owner_id_resolver = OwnerIdResolver()
+
+
 async def get_owner_ids(bot: commands.Bot) -> typing.Set[int]:
+    return await owner_id_resolver.resolve(bot)
+
+
+async def fetch_owner_ids(bot: commands.Bot) -> typing.Set[int]:
     ids = set()
     if bot.owner_id:
         ids.add(bot.owner_id)
@@ -92,8 +247,10 @@ async def get_owner_ids(bot: commands.Bot) -> typing.Set[int]:
     return ids
 
 
-async def index_command(log: Logger, bot: commands.Bot, cmd: commands.Command) -> typing.Optional[dict]:
-    if cmd.hidden:
+async def index_command(log: Logger, bot: commands.Bot, cmd: commands.Command, depth: int = 0,
+                        include_hidden: bool = False) -> typing.Optional[dict]:
+    # include_hidden is for commands registered on purpose somewhere specific, e.g. guild-only ones
+    if cmd.hidden and not include_hidden:
         return None
 
     def trunc(s: str, _l: int):
@@ -107,18 +264,26 @@ async def index_command(log: Logger, bot: commands.Bot, cmd: commands.Command) -
         "options": []
     }
     if isinstance(cmd, commands.Group):
+        if depth >= 2:
+            log.error(f"Subcommand group {cmd.qualified_name} is nested too deeply (discord only allows command -> group -> subcommand)")
+            return None
         if len(cmd.commands) >= 25:
             log.error(f"Amount of subcommands for the group {cmd.name} exceeds 25 (discord limit)")
             return None
-        for sub_cmd in cmd.commands:  # type: commands.Command
-            sub_cmd_data = await index_command(log, bot, sub_cmd)
-            if sub_cmd_data is None:
-                continue
-            cmd_data["options"].append(sub_cmd_data)
+        sub_cmds = await asyncio.gather(*(index_command(log, bot, sub_cmd, depth + 1) for sub_cmd in cmd.commands))
+        cmd_data["options"].extend(sub_cmd_data for sub_cmd_data in sub_cmds if sub_cmd_data is not None)
 
         if len(cmd_data["options"]) < 1:  # ignore empty subcommands
             return None
 
+        if depth > 0:
+            cmd_data["type"] = ApplicationCommandOptionType.SUB_COMMAND_GROUP
+        return cmd_data
+
+    if depth > 0:
+        # subcommands are options of their parent, permissions and flags only apply to top-level commands
+        cmd_data["type"] = ApplicationCommandOptionType.SUB_COMMAND
+        cmd_data["options"] = command_options(log, cmd)
         return cmd_data
 
     for check in cmd.checks:
@@ -146,6 +311,6 @@ async def index_command(log: Logger, bot: commands.Bot, cmd: commands.Command) -
         cmd_data["default_permission"] = True
     if "permissions" not in cmd_data:
         cmd_data["permissions"] = []
-    cmd_data["options"] = index_callback_parameters(log, cmd.callback)
+    cmd_data["options"] = command_options(log, cmd)
 
     return cmd_data
@@ -22,9 +22,28 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import asyncio
+import typing
+
 import discord
 from discord.ext import commands
 
+from .coalesce import SendCoalescer
+from .followups import FollowupScheduler
+from .offload import OffloadPools
+
+# send() kwargs that edit_original_response() can take over, anything else has to go through a followup
+EDITABLE_SEND_KWARGS = {"content", "embed", "embeds", "file", "files", "view", "allowed_mentions"}
+# send() kwargs that InteractionResponse.send_message() can take, for commands that reply before being deferred
+RESPONSE_SEND_KWARGS = {"content", "embed", "embeds", "file", "files", "view", "tts", "ephemeral", "allowed_mentions",
+                        "suppress_embeds", "silent"}
+
+
+async def defer_pending(interaction: discord.Interaction, lock: asyncio.Lock) -> None:
+    async with lock:
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+
 
 class InteractContext(commands.Context):
     """Wrapper around InteractionRespone"""
@@ -32,21 +51,104 @@ class InteractContext(commands.Context):
     def __init__(self, **attrs):
         super().__init__(**attrs)
         self.parent_interaction = self.message.parent_interaction  # type: discord.Interaction
-        self.response = discord.InteractionResponse(self.message.parent_interaction)
+        self.response = self.parent_interaction.response  # type: discord.InteractionResponse
+        self.response_lock = asyncio.Lock()
+        self.original_filled = False
+        self.coalescer = None  # type: typing.Optional[SendCoalescer]
+        self.followups = None  # type: typing.Optional[FollowupScheduler]
+        self.pools = None  # type: typing.Optional[OffloadPools]
+        self.offload_pool = "thread"
+
+    def can_fill_original(self, kwargs: typing.Dict[str, typing.Any]) -> bool:
+        if self.original_filled or not self.response.is_done():
+            return False
+        if kwargs.get("ephemeral", False) or kwargs.get("tts", False):
+            return False
+        return all(k in EDITABLE_SEND_KWARGS or k in ("ephemeral", "tts") for k in kwargs.keys())
+
+    def enable_coalescing(self, window: float = 0.25) -> None:
+        self.coalescer = SendCoalescer(self.send_now, window)
+
+    async def flush(self) -> None:
+        if self.coalescer is not None:
+            await self.coalescer.flush()
 
     async def send(self, *args, **kwargs):
+        if args:
+            kwargs["content"] = args[0]
+        if self.coalescer is not None:
+            if self.coalescer.can_coalesce(kwargs):
+                return await self.coalescer.add(kwargs)
+            await self.coalescer.flush()  # keep the order of what was buffered before
+        return await self.send_now(**kwargs)
+
+    async def send_now(self, **kwargs):
         delete_after = kwargs.pop("delete_after", None)
-        # if not self.response.is_done() and False:
-        #     await self.response.send_message(ephemeral=False, *args, **kwargs)
-        # else:
-        await self.parent_interaction.followup.send(*args, **kwargs)
-        msg = await self.parent_interaction.original_response()
+        priority = kwargs.pop("priority", 0)
+
+        msg = None
+        async with self.response_lock:
+            if not self.response.is_done():
+                msg = await self.respond(kwargs)
+            elif self.can_fill_original(kwargs):
+                msg = await self.fill_original(kwargs)
+        if msg is None:
+            msg = await self.send_followup(kwargs, priority)
 
         if delete_after is not None:
             await msg.delete(delay=delete_after)
 
         return msg
 
+    async def send_followup(self, kwargs: typing.Dict[str, typing.Any], priority: int = 0) -> discord.Message:
+        followup = self.parent_interaction.followup
+        if self.followups is None:
+            return await followup.send(wait=True, **kwargs)
+
+        async def send():
+            return await followup.send(wait=True, **kwargs)
+
+        async def send_to_channel():
+            # the interaction token expired, post it as a regular message instead
+            return await self.channel.send(**{k: v for k, v in kwargs.items() if k in RESPONSE_SEND_KWARGS and k != "ephemeral"})
+
+        fallback = send_to_channel if not kwargs.get("ephemeral", False) else None
+        return await self.followups.submit(self.parent_interaction, send, fallback, priority)
+
+    async def respond(self, kwargs: typing.Dict[str, typing.Any]) -> typing.Optional[discord.InteractionMessage]:
+        # nothing was deferred yet, make this the initial response
+        if not all(k in RESPONSE_SEND_KWARGS for k in kwargs.keys()):
+            await self.response.defer()
+            return await self.fill_original(kwargs) if self.can_fill_original(kwargs) else None
+        callback = await self.response.send_message(**kwargs)
+        self.original_filled = True
+        msg = getattr(callback, "resource", None)  # discord.py >= 2.5 returns the created message
+        if not isinstance(msg, discord.InteractionMessage):
+            msg = await self.parent_interaction.original_response()
+        return msg
+
+    async def fill_original(self, kwargs: typing.Dict[str, typing.Any]) -> discord.InteractionMessage:
+        # the first message after deferring replaces the "thinking..." response
+        kwargs.pop("ephemeral", None)
+        kwargs.pop("tts", None)
+        attachments = [kwargs.pop("file")] if "file" in kwargs else kwargs.pop("files", None)
+        if attachments is not None:
+            kwargs["attachments"] = attachments
+        msg = await self.parent_interaction.edit_original_response(**kwargs)
+        self.original_filled = True
+        return msg
+
+    async def defer_if_pending(self) -> None:
+        await defer_pending(self.parent_interaction, self.response_lock)
+
+    async def run_blocking(self, fn: typing.Callable, *args: typing.Any, pool: str = None) -> typing.Any:
+        """Runs fn(*args) on the cog's thread or process pool (by default the one set with @slash_cog.offload),
+        deferring the interaction first if it hasn't been responded to yet"""
+        await self.defer_if_pending()
+        if self.pools is None:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        return await self.pools.run(pool or self.offload_pool, fn, *args)
+
     async def reply(self, *args, **kwargs):
         kwargs.pop("mention_author", None)  # interactions don't support mentioning author
         return await self.send(*args, **kwargs)
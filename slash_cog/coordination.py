@@ -0,0 +1,178 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import abc
+import asyncio
+import json
+import os
+import re
+import time
+import typing
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+
+class CoordinationBackend(abc.ABC):
+    """Lets processes of the same application elect a single registrar and share the generated command map"""
+
+    poll_interval = 0.25
+
+    @abc.abstractmethod
+    def try_acquire(self, name: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release(self, name: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def publish(self, key: str, value: dict) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fetch(self, key: str) -> typing.Optional[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def unpublish(self, key: str) -> None:
+        raise NotImplementedError
+
+    def lock(self, name: str, timeout: typing.Optional[float] = None) -> "_Lease":
+        return _Lease(self, name, timeout)
+
+
+class _Lease:
+    def __init__(self, backend: CoordinationBackend, name: str, timeout: typing.Optional[float]):
+        self.backend = backend
+        self.name = name
+        self.timeout = timeout
+
+    async def __aenter__(self) -> "_Lease":
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self.backend.try_acquire(self.name):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"Timed out waiting for the {self.name} lock")
+            await asyncio.sleep(self.backend.poll_interval)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.backend.release(self.name)
+
+
+class LoopbackBackend(CoordinationBackend):
+    """In-memory stand-in, coordinates every cog sharing the same instance (e.g. several bots in one process, or tests)"""
+
+    poll_interval = 0.01
+
+    def __init__(self):
+        self.held = set()  # type: typing.Set[str]
+        self.published = {}  # type: typing.Dict[str, dict]
+
+    def try_acquire(self, name: str) -> bool:
+        if name in self.held:
+            return False
+        self.held.add(name)
+        return True
+
+    def release(self, name: str) -> None:
+        self.held.discard(name)
+
+    def publish(self, key: str, value: dict) -> None:
+        # round-trip through json so nobody shares mutable state with the publisher
+        self.published[key] = json.loads(json.dumps(value))
+
+    def fetch(self, key: str) -> typing.Optional[dict]:
+        value = self.published.get(key, None)
+        return json.loads(json.dumps(value)) if value is not None else None
+
+    def unpublish(self, key: str) -> None:
+        self.published.pop(key, None)
+
+
+class FileLockBackend(CoordinationBackend):
+    """Coordinates processes on the same host through OS file locks in a shared directory
+
+    The OS drops the lock when its holder dies, so a crashed registrar never blocks the others.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.handles = {}  # type: typing.Dict[str, typing.IO]
+
+    def _path(self, name: str, ext: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ext)
+
+    def try_acquire(self, name: str) -> bool:
+        if name in self.handles:
+            return False
+        f = open(self._path(name, ".lock"), "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self.handles[name] = f
+        return True
+
+    def release(self, name: str) -> None:
+        f = self.handles.pop(name, None)
+        if f is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+    def publish(self, key: str, value: dict) -> None:
+        path = self._path(key, ".json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)  # readers never see a partially written map
+
+    def fetch(self, key: str) -> typing.Optional[dict]:
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def unpublish(self, key: str) -> None:
+        try:
+            os.remove(self._path(key, ".json"))
+        except FileNotFoundError:
+            pass
@@ -22,7 +22,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from typing import Callable
+from typing import Any, Callable
 
 
 def set_extra_data(fn: Callable, k: str, v) -> None:
@@ -31,13 +31,70 @@ def set_extra_data(fn: Callable, k: str, v) -> None:
     fn.slash_extras[k] = v
 
 
+def get_extra_data(cmd: Any, k: str, default=None) -> Any:
+    # decorators may be applied either below (callback) or above (Command object) @commands.command()
+    for obj in (getattr(cmd, "callback", None), cmd):
+        extras = getattr(obj, "slash_extras", None)
+        if extras is not None and k in extras:
+            return extras[k]
+    return default
+
+
+def defer(mode: str = "eager") -> Callable:
+    """Sets how a command's interaction gets deferred, "eager" (before invoking) or "adaptive" (only if it's slow to reply)"""
+    if mode not in ("eager", "adaptive"):
+        raise ValueError(f"Unknown defer mode {mode}")
+
+    def decorator(fn: Callable) -> Callable:
+        set_extra_data(fn, "defer", mode)
+        return fn
+
+    return decorator
+
+
+def offload(pool: str = "thread") -> Callable:
+    """Marks a command as blocking, its interaction is deferred right away and ``ctx.run_blocking`` runs on this pool
+    ("thread" or "process")"""
+    if pool not in ("thread", "process"):
+        raise ValueError(f"Unknown pool {pool}")
+
+    def decorator(fn: Callable) -> Callable:
+        set_extra_data(fn, "offload", pool)
+        return fn
+
+    return decorator
+
+
+def autocomplete(**sources) -> Callable:
+    """Autocompletes parameters from choice sources, e.g. ``@autocomplete(item="items")`` for a source added with
+    ``SlashCommands.add_choice_source("items", [...])``, or a PrefixIndex passed directly"""
+
+    def decorator(fn: Callable) -> Callable:
+        existing = getattr(fn, "slash_extras", {}).get("autocomplete", {})
+        set_extra_data(fn, "autocomplete", dict(existing, **sources))
+        return fn
+
+    return decorator
+
+
 def inject_extracted(fn: Callable) -> Callable:
     def runner(*args, **kwargs):
         r = fn(*args, **kwargs)
+        # positional arguments too, has_role(item) and has_any_role(*items) only take those
         if "__wrapped__" in r.predicate.__dict__.keys():
-            set_extra_data(r.predicate.__wrapped__, fn.__name__, kwargs)
+            set_extra_data(r.predicate.__wrapped__, fn.__name__, dict(kwargs, args=args))
         else:
-            set_extra_data(r.predicate, fn.__name__, kwargs)
+            set_extra_data(r.predicate, fn.__name__, dict(kwargs, args=args))
         return r
 
     return runner
+
+
+def coalesce(enabled: bool = True) -> Callable:
+    """Buffers the command's consecutive sends and merges them into as few messages as possible"""
+
+    def decorator(fn: Callable) -> Callable:
+        set_extra_data(fn, "coalesce", enabled)
+        return fn
+
+    return decorator
@@ -0,0 +1,233 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import typing
+
+from discord.ext import commands
+from discord.ext.commands.converter import run_converters
+from discord.ext.commands.core import hooked_wrapped_callback
+from discord.ext.commands.hybrid import HybridCommand, HybridGroup
+
+from .api_constants import ApplicationCommandOptionType
+from .resolved import RESOLVED_OPTION_TYPES, ResolvedData
+
+NATIVE_OPTION_TYPES = (str, int, float, bool)
+SUB_COMMAND_TYPES = (ApplicationCommandOptionType.SUB_COMMAND, ApplicationCommandOptionType.SUB_COMMAND_GROUP)
+
+CommandPath = typing.Tuple[str, ...]
+
+
+class ParameterPlan:
+    __slots__ = ("name", "param", "converter", "kind", "required", "optional", "greedy", "native")
+
+    def __init__(self, cmd: commands.Command, param: commands.Parameter):
+        converter = param.converter
+        self.greedy = isinstance(converter, commands.Greedy)
+        if self.greedy:
+            param = param.replace(annotation=converter.converter)
+            converter = param.converter
+        self.name = param.name
+        self.param = param
+        self.converter = converter
+        self.kind = param.kind
+        self.required = param.required
+        self.optional = cmd._is_typing_optional(param.annotation)
+        self.native = converter in NATIVE_OPTION_TYPES
+
+
+class CommandPlan:
+    """Everything needed to bind interaction options to a command, computed once per command"""
+    __slots__ = ("path", "command", "parent", "params", "option_order", "required")
+
+    def __init__(self, path: CommandPath, cmd: commands.Command, parent: typing.Optional["CommandPlan"] = None):
+        self.path = path
+        self.command = cmd
+        self.parent = parent
+        self.params = [ParameterPlan(cmd, param) for param in cmd.params.values()]
+        self.option_order = [p.name for p in self.params]
+        self.required = {p.name for p in self.params if p.required and not p.optional}
+
+    @property
+    def chain(self) -> typing.List["CommandPlan"]:
+        chain = []
+        plan = self
+        while plan is not None:
+            chain.append(plan)
+            plan = plan.parent
+        chain.reverse()
+        return chain
+
+
+class DispatchIndex:
+    def __init__(self):
+        self.plans = {}  # type: typing.Dict[CommandPath, CommandPlan]
+        self.stale = True
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def build(self, _commands: typing.Iterable[commands.Command]) -> None:
+        plans = {}
+
+        def walk(cmd: commands.Command, parent: typing.Optional[CommandPlan]):
+            if isinstance(cmd, (HybridCommand, HybridGroup)):
+                return  # handled by discord.py's own command tree
+            path = (parent.path if parent is not None else ()) + (cmd.name,)
+            plan = plans[path] = CommandPlan(path, cmd, parent)
+            if isinstance(cmd, commands.Group):
+                for sub_cmd in cmd.commands:
+                    walk(sub_cmd, plan)
+
+        for cmd in _commands:
+            walk(cmd, None)
+        self.plans = plans
+        self.stale = False
+
+    def resolve(self, data: dict, aliases: typing.Dict[str, str] = None) -> typing.Tuple[typing.Optional[CommandPlan], typing.Dict[str, dict], typing.Optional[str]]:
+        path = [data["name"] if aliases is None else aliases.get(data["name"], data["name"])]
+        options = data.get("options", [])
+        while options and options[0].get("type", None) in SUB_COMMAND_TYPES:
+            path.append(options[0]["name"])
+            options = options[0].get("options", [])
+
+        bound = {}
+        focused = None
+        for opt in options:
+            bound[opt["name"]] = opt
+            if opt.get("focused", False):
+                focused = opt["name"]
+        return self.plans.get(tuple(path), None), bound, focused
+
+
+async def convert_option(ctx: commands.Context, p: ParameterPlan, value: typing.Any) -> typing.Any:
+    if p.native and type(value) is p.converter:
+        return value  # discord already sent it typed, skip the string round trip
+    ctx.current_argument = argument = str(value)
+    return await run_converters(ctx, p.converter, argument, p.param)
+
+
+async def bind_arguments(ctx: commands.Context, plan: CommandPlan, options: typing.Dict[str, dict]) -> None:
+    cmd = plan.command
+    ctx.args = args = [ctx] if cmd.cog is None else [cmd.cog, ctx]
+    ctx.kwargs = kwargs = {}
+    resolved = None  # type: typing.Optional[ResolvedData]
+
+    for p in plan.params:
+        ctx.current_parameter = p.param
+        opt = options.get(p.name, None)
+
+        if p.kind == p.param.VAR_POSITIONAL or p.greedy:
+            words = str(opt["value"]).split() if opt is not None else []
+            if not words and p.kind == p.param.VAR_POSITIONAL and cmd.require_var_positional:
+                raise commands.MissingRequiredArgument(p.param)
+            values = [await convert_option(ctx, p, word) for word in words]
+            if p.kind == p.param.VAR_POSITIONAL:
+                args.extend(values)
+            elif p.kind == p.param.KEYWORD_ONLY:
+                kwargs[p.name] = values
+            else:
+                args.append(values)
+            continue
+
+        if opt is None:
+            if p.name in plan.required:
+                raise commands.MissingRequiredArgument(p.param)
+            value = None if p.required else await p.param.get_default(ctx)
+        else:
+            value = None
+            if opt["type"] in RESOLVED_OPTION_TYPES:
+                if resolved is None:
+                    resolved = ResolvedData(ctx.parent_interaction)
+                value = resolved.convert(opt, p.converter)
+            if value is None:
+                value = await convert_option(ctx, p, opt["value"])
+
+        if p.kind == p.param.KEYWORD_ONLY:
+            kwargs[p.name] = value
+        else:
+            args.append(value)
+
+
+async def prepare_command(ctx: commands.Context, plan: CommandPlan, options: typing.Dict[str, dict]) -> None:
+    # mirrors Command.prepare, except that the arguments are bound from the interaction options
+    cmd = plan.command
+    ctx.command = cmd
+    if not await cmd.can_run(ctx):
+        raise commands.CheckFailure(f"The check functions for command {cmd.qualified_name} failed.")
+
+    if cmd._max_concurrency is not None:
+        await cmd._max_concurrency.acquire(ctx)
+
+    try:
+        if cmd.cooldown_after_parsing:
+            await bind_arguments(ctx, plan, options)
+            cmd._prepare_cooldowns(ctx)
+        else:
+            cmd._prepare_cooldowns(ctx)
+            await bind_arguments(ctx, plan, options)
+        await cmd.call_before_hooks(ctx)
+    except:
+        if cmd._max_concurrency is not None:
+            await cmd._max_concurrency.release(ctx.message)
+        raise
+
+
+async def invoke_chain(ctx: commands.Context, chain: typing.List[CommandPlan], options: typing.Dict[str, dict]) -> None:
+    # mirrors Group.invoke / Command.invoke for an already resolved chain of commands
+    for parent, child in zip(chain, chain[1:]):  # type: CommandPlan, CommandPlan
+        group = parent.command  # type: commands.Group
+        ctx.invoked_subcommand = None
+        ctx.subcommand_passed = None
+        early_invoke = not group.invoke_without_command
+        if early_invoke:
+            await prepare_command(ctx, parent, {})
+
+        ctx.subcommand_passed = child.command.name
+        ctx.invoked_subcommand = child.command
+        if early_invoke:
+            await hooked_wrapped_callback(group, ctx, group.callback)(*ctx.args, **ctx.kwargs)
+
+        ctx.invoked_parents.append(ctx.invoked_with)
+        ctx.invoked_with = child.command.name
+
+    leaf = chain[-1].command
+    await prepare_command(ctx, chain[-1], options)
+    ctx.invoked_subcommand = None
+    ctx.subcommand_passed = None
+    await hooked_wrapped_callback(leaf, ctx, leaf.callback)(*ctx.args, **ctx.kwargs)
+
+
+async def invoke_direct(bot: commands.Bot, ctx: commands.Context, plan: CommandPlan, options: typing.Dict[str, dict]) -> None:
+    # mirrors Bot.invoke, dispatching the same events so error handlers keep working
+    ctx.command = plan.command
+    bot.dispatch("command", ctx)
+    try:
+        if await bot.can_run(ctx, call_once=True):
+            await invoke_chain(ctx, plan.chain, options)
+        else:
+            raise commands.CheckFailure("The global check once functions failed.")
+    except commands.CommandError as exc:
+        await ctx.command.dispatch_error(ctx, exc)
+    else:
+        bot.dispatch("command_completion", ctx)
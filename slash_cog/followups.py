@@ -0,0 +1,180 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+import typing
+from datetime import timedelta
+
+import discord
+
+from .cache import TTLCache
+
+# interaction tokens are valid for 15 minutes, leave some room for the request itself
+TOKEN_LIFETIME = timedelta(minutes=15)
+TOKEN_EXPIRY_MARGIN = 30.0
+
+SendFactory = typing.Callable[[], typing.Awaitable[typing.Any]]
+
+
+class _Job:
+    __slots__ = ("future", "send", "fallback", "enqueued_at", "expires_at")
+
+    def __init__(self, future: asyncio.Future, send: SendFactory, fallback: typing.Optional[SendFactory], expires_at: float):
+        self.future = future
+        self.send = send
+        self.fallback = fallback
+        self.enqueued_at = time.monotonic()
+        self.expires_at = expires_at
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "blocked_until", "heap", "worker")
+
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.heap = []  # type: typing.List[typing.Tuple[int, int, _Job]]
+        self.worker = None  # type: typing.Optional[asyncio.Task]
+
+
+class FollowupScheduler:
+    """
+    Queues followup sends per interaction token, pacing them with a token bucket so that concurrent commands don't
+    stall each other in discord.py's HTTP layer. Lower priorities are sent first, ``max_queue`` bounds how many
+    sends may be waiting before callers are held back, and sends whose token expired fall back to a channel message.
+    """
+
+    def __init__(self, rate: int = 5, per: float = 2.0, max_queue: int = 1000, max_tokens: int = 10000):
+        self.rate = rate
+        self.per = per
+        # buckets outlive their queue so that sequential sends and 429s keep counting against the token's budget
+        self.buckets = TTLCache(maxsize=max_tokens, ttl=TOKEN_LIFETIME.total_seconds())
+        self.capacity = asyncio.Semaphore(max_queue)
+        self.seq = itertools.count()
+
+        self.queued = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.fallbacks = 0
+        self.rate_limited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        done = self.sent + self.failed + self.fallbacks
+        return {
+            "queued": self.queued,
+            "max_depth": self.max_depth,
+            "buckets": len(self.buckets),
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "failed": self.failed,
+            "fallbacks": self.fallbacks,
+            "rate_limited": self.rate_limited,
+            "wait_avg": self.wait_total / done if done else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+    async def submit(self, interaction: discord.Interaction, send: SendFactory, fallback: SendFactory = None, priority: int = 0) -> typing.Any:
+        await self.capacity.acquire()  # backpressure once too many sends are waiting
+        try:
+            expires_in = (interaction.created_at + TOKEN_LIFETIME - discord.utils.utcnow()).total_seconds() - TOKEN_EXPIRY_MARGIN
+            job = _Job(asyncio.get_event_loop().create_future(), send, fallback, time.monotonic() + expires_in)
+
+            bucket = self.buckets.get(interaction.token, None)
+            if bucket is None:
+                bucket = _Bucket(self.rate)
+                self.buckets.set(interaction.token, bucket)
+            heapq.heappush(bucket.heap, (priority, next(self.seq), job))
+            self.submitted += 1
+            self.queued += 1
+            self.max_depth = max(self.max_depth, self.queued)
+            if bucket.worker is None:
+                bucket.worker = asyncio.ensure_future(self._drain(bucket))
+            return await job.future
+        finally:
+            self.capacity.release()
+
+    async def _take(self, bucket: _Bucket) -> None:
+        while True:
+            now = time.monotonic()
+            if now < bucket.blocked_until:
+                await asyncio.sleep(bucket.blocked_until - now)
+                continue
+            bucket.tokens = min(self.rate, bucket.tokens + (now - bucket.updated) * self.rate / self.per)
+            bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return
+            await asyncio.sleep((1 - bucket.tokens) * self.per / self.rate)
+
+    async def _drain(self, bucket: _Bucket) -> None:
+        try:
+            while bucket.heap:
+                _, _, job = heapq.heappop(bucket.heap)
+                if job.future.done():  # caller went away
+                    self.queued -= 1
+                    continue
+                expired = time.monotonic() >= job.expires_at
+                if not expired:
+                    await self._take(bucket)
+                    expired = time.monotonic() >= job.expires_at
+
+                wait = time.monotonic() - job.enqueued_at
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+                self.queued -= 1
+                await self._run(bucket, job, expired)
+        finally:
+            bucket.worker = None
+
+    async def _run(self, bucket: _Bucket, job: _Job, expired: bool) -> None:
+        try:
+            if expired and job.fallback is not None:
+                result = await job.fallback()
+                self.fallbacks += 1
+            else:
+                result = await job.send()
+                self.sent += 1
+        except discord.HTTPException as e:
+            self.failed += 1
+            if e.status == 429:
+                self.rate_limited += 1
+                retry_after = float(e.response.headers.get("Retry-After", self.per))
+                bucket.blocked_until = time.monotonic() + retry_after
+            if not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
@@ -0,0 +1,86 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import hashlib
+import json
+import os
+import typing
+from datetime import datetime
+
+LEDGER_VERSION = 1
+
+
+def canonical_json(cmd_map: typing.List[dict]) -> str:
+    # top-level command order is irrelevant to discord, option order is not
+    return json.dumps(sorted(cmd_map, key=lambda c: c["name"]), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def hash_command_map(cmd_map: typing.List[dict]) -> str:
+    return hashlib.sha256(canonical_json(cmd_map).encode("utf-8")).hexdigest()
+
+
+class RegistrationLedger:
+    """Persists what was last registered to each endpoint so unchanged command maps aren't re-sent"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"version": LEDGER_VERSION, "applications": {}}
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version", None) == LEDGER_VERSION:
+            self.data = data
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)  # atomic, a crash mid-write won't corrupt the ledger
+
+    def _endpoints(self, application_id: int) -> typing.Dict[str, dict]:
+        return self.data["applications"].setdefault(str(application_id), {})
+
+    def endpoints(self, application_id: int) -> typing.Set[str]:
+        return set(self._endpoints(application_id).keys())
+
+    def get_digest(self, application_id: int, endpoint: str) -> typing.Optional[str]:
+        entry = self._endpoints(application_id).get(endpoint, None)
+        return entry["hash"] if entry is not None else None
+
+    def record(self, application_id: int, endpoint: str, digest: str, count: int) -> None:
+        self._endpoints(application_id)[endpoint] = {
+            "hash": digest,
+            "count": count,
+            "registered_at": datetime.isoformat(datetime.utcnow()),
+        }
+        self.save()
+
+    def forget(self, application_id: int, endpoint: str) -> None:
+        if self._endpoints(application_id).pop(endpoint, None) is not None:
+            self.save()
@@ -0,0 +1,92 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import copy
+import json
+import os
+import typing
+from datetime import datetime
+
+import discord
+from discord.ext import commands
+
+from . import command_map
+
+MANIFEST_VERSION = 1
+
+
+async def build_manifest(log, bot: commands.Bot) -> dict:
+    entries = {}
+    for cmd in bot.commands:
+        entries[cmd.name] = {
+            "fingerprint": command_map.commands_fingerprint([cmd]),
+            "payload": await command_map.index_command(log, bot, cmd),
+        }
+
+    parameters = {}
+    for cmd in bot.walk_commands():
+        if not isinstance(cmd, commands.Group):
+            parameters[command_map.callback_fingerprint(cmd.callback)] = command_map.index_callback_parameters(log, cmd.callback)
+
+    return {
+        "version": MANIFEST_VERSION,
+        "built_at": datetime.isoformat(datetime.utcnow()),
+        "discord.py": discord.__version__,
+        "fingerprint": command_map.commands_fingerprint(bot.commands),
+        "commands": entries,
+        "parameters": parameters,
+    }
+
+
+def write_manifest(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class CommandManifest:
+    """A prebuilt command map, reused for every top-level command whose source fingerprint still matches"""
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.entries = data["commands"]  # type: typing.Dict[str, dict]
+        self.parameters = data["parameters"]  # type: typing.Dict[str, typing.List[dict]]
+
+    @classmethod
+    def load(cls, path: str) -> "CommandManifest":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version", None) != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported command manifest version {data.get('version', None)} in {path}")
+        return cls(data)
+
+    def lookup(self, cmd: commands.Command) -> typing.Optional[dict]:
+        entry = self.entries.get(cmd.name, None)
+        if entry is None or entry["fingerprint"] != command_map.commands_fingerprint([cmd]):
+            return None
+        return entry
+
+    def payload(self, entry: dict) -> typing.Optional[dict]:
+        return copy.deepcopy(entry["payload"])
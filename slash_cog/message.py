@@ -22,10 +22,77 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import typing
+from datetime import datetime
+
 import discord
 
 
-class InteractMessage(discord.Message):
-    def __init__(self, *, state, channel, data, parent_interaction: discord.Interaction):
-        super().__init__(state=state, channel=channel, data=data)
+class PartialInteractMessage:
+    """
+    Slotted message stand-in for interactions, no message payload is built or parsed. Guild and creation time come
+    from the interaction when accessed, as does the author unless a resolved member is passed, mentions and attachments are only built from their raw payloads
+    if a converter asks for them.
+    """
+
+    __slots__ = ("_state", "channel", "parent_interaction", "content", "_author", "_mentions", "_attachments")
+
+    edited_at = None
+    reference = None
+    webhook_id = None
+    type = discord.MessageType.default
+    tts = False
+    pinned = False
+    mention_everyone = False
+    embeds = ()
+    stickers = ()
+    components = ()
+    role_mentions = ()
+    channel_mentions = ()
+
+    def __init__(self, *, state, channel, parent_interaction: discord.Interaction, content: str = "",
+                 author: typing.Optional[discord.Member] = None, mentions: typing.List[dict] = None,
+                 attachments: typing.List[dict] = None):
+        self._state = state
+        self.channel = channel
         self.parent_interaction = parent_interaction
+        self.content = content
+        self._author = author
+        self._mentions = mentions or ()  # type: typing.Union[typing.Sequence[dict], typing.List[discord.abc.User]]
+        self._attachments = attachments or ()  # type: typing.Union[typing.Sequence[dict], typing.List[discord.Attachment]]
+
+    def __repr__(self) -> str:
+        return f"<PartialInteractMessage id={self.id} channel={self.channel!r} author={self.author!r}>"
+
+    @property
+    def id(self) -> int:
+        return self.parent_interaction.id
+
+    @property
+    def author(self) -> typing.Union[discord.User, discord.Member]:
+        return self._author or self.parent_interaction.user
+
+    @property
+    def guild(self) -> typing.Optional[discord.Guild]:
+        return self.parent_interaction.guild
+
+    @property
+    def created_at(self) -> datetime:
+        return self.parent_interaction.created_at
+
+    @property
+    def mentions(self) -> typing.List[discord.abc.User]:
+        if self._mentions and isinstance(self._mentions[0], dict):
+            guild = self.guild
+            if guild is None:
+                self._mentions = [self._state.store_user(m) for m in self._mentions]
+            else:
+                self._mentions = [guild.get_member(int(m["id"])) or discord.Member._try_upgrade(data=m, guild=guild, state=self._state)
+                                  for m in self._mentions]
+        return list(self._mentions)
+
+    @property
+    def attachments(self) -> typing.List[discord.Attachment]:
+        if self._attachments and isinstance(self._attachments[0], dict):
+            self._attachments = [discord.Attachment(data=a, state=self._state) for a in self._attachments]
+        return list(self._attachments)
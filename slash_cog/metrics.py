@@ -0,0 +1,156 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import bisect
+import time
+import typing
+
+# seconds, tuned for the interaction hot path (sub-millisecond stages up to slow commands)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = typing.Tuple[typing.Tuple[str, str], ...]
+MetricHook = typing.Callable[[str, str, typing.Dict[str, str], float], None]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: typing.Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: typing.Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Metrics:
+    """In-memory histograms, counters and gauges with pluggable sinks (hooks, snapshot() and render_prometheus())"""
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms = {}  # type: typing.Dict[typing.Tuple[str, Labels], Histogram]
+        self.counters = {}  # type: typing.Dict[typing.Tuple[str, Labels], float]
+        self.gauges = {}  # type: typing.Dict[typing.Tuple[str, Labels], float]
+        self.hooks = []  # type: typing.List[MetricHook]
+
+    def add_hook(self, hook: MetricHook) -> None:
+        """``hook(kind, name, labels, value)`` is called for every observation, kind being "histogram", "counter" or "gauge\""""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: MetricHook) -> None:
+        self.hooks.remove(hook)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key, None)
+        if hist is None:
+            hist = self.histograms[key] = Histogram(self.buckets)
+        hist.observe(value)
+        for hook in self.hooks:
+            hook("histogram", name, labels, value)
+
+    def incr(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+        for hook in self.hooks:
+            hook("counter", name, labels, amount)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+        for hook in self.hooks:
+            hook("gauge", name, labels, value)
+
+    def timer(self, name: str, **labels: str) -> _Timer:
+        return _Timer(self, name, labels)
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+        self.gauges.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), **hist.snapshot()} for (name, labels), hist in self.histograms.items()],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.gauges.items()],
+        }
+
+    def render_prometheus(self, namespace: str = "slash_cog") -> str:
+        def fmt_labels(labels: typing.Iterable[typing.Tuple[str, str]]) -> str:
+            labels = list(labels)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+        lines = []
+        for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({name for name, _ in values.keys()}):
+                lines.append(f"# TYPE {namespace}_{name} {kind}")
+                for (v_name, labels), value in values.items():
+                    if v_name == name:
+                        lines.append(f"{namespace}_{name}{fmt_labels(labels)} {value}")
+        for name in sorted({name for name, _ in self.histograms.keys()}):
+            lines.append(f"# TYPE {namespace}_{name} histogram")
+            for (h_name, labels), hist in self.histograms.items():
+                if h_name != name:
+                    continue
+                for bound, count in hist.snapshot()["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{namespace}_{name}_bucket{fmt_labels(labels + (('le', le),))} {count}")
+                lines.append(f"{namespace}_{name}_sum{fmt_labels(labels)} {hist.sum}")
+                lines.append(f"{namespace}_{name}_count{fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: typing.Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
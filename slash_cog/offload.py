@@ -0,0 +1,131 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import os
+import time
+import typing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import Metrics
+
+POOL_KINDS = ("thread", "process")
+
+
+def _timed_call(fn: typing.Callable, args: tuple) -> typing.Tuple[float, typing.Any]:
+    # wall clock instead of a monotonic one, process pool workers don't share the parent's monotonic clock
+    return time.time(), fn(*args)
+
+
+class _Pool:
+    __slots__ = ("kind", "size", "executor", "inflight", "completed", "wait_total", "wait_max")
+
+    def __init__(self, kind: str, size: int):
+        self.kind = kind
+        self.size = size
+        self.executor = None  # type: typing.Optional[Executor]  # created on first use, process pools spawn workers
+        self.inflight = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def running(self) -> int:
+        return min(self.inflight, self.size)
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.inflight - self.size)
+
+    def get_executor(self) -> Executor:
+        if self.executor is None:
+            if self.kind == "thread":
+                self.executor = ThreadPoolExecutor(self.size, thread_name_prefix="slash_cog")
+            else:
+                self.executor = ProcessPoolExecutor(self.size)
+        return self.executor
+
+
+class OffloadPools:
+    """
+    A thread pool and a process pool for the blocking parts of commands, so they don't hold up the event loop (and
+    with it, the acknowledgement of every other interaction). Threads suit work that releases the GIL (I/O, most C
+    extensions), processes pure python CPU-bound work, whose function and arguments then have to be picklable.
+    """
+
+    def __init__(self, thread_workers: typing.Optional[int] = None, process_workers: typing.Optional[int] = None,
+                 metrics: typing.Optional[Metrics] = None):
+        cpus = os.cpu_count() or 1
+        self.pools = {
+            "thread": _Pool("thread", thread_workers or min(32, cpus + 4)),
+            "process": _Pool("process", process_workers or cpus),
+        }
+        self.metrics = metrics
+
+    def _report(self, pool: _Pool) -> None:
+        if self.metrics is not None:
+            self.metrics.set_gauge("offload_running", pool.running, pool=pool.kind)
+            self.metrics.set_gauge("offload_queued", pool.queued, pool=pool.kind)
+            self.metrics.set_gauge("offload_saturation", pool.inflight / pool.size, pool=pool.kind)
+
+    async def run(self, pool_kind: str, fn: typing.Callable, *args: typing.Any) -> typing.Any:
+        pool = self.pools.get(pool_kind, None)
+        if pool is None:
+            raise ValueError(f"Unknown pool {pool_kind}, expected one of {', '.join(POOL_KINDS)}")
+
+        submitted = time.time()
+        pool.inflight += 1
+        self._report(pool)
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(pool.get_executor(), _timed_call, fn, args)
+        finally:
+            pool.inflight -= 1
+            self._report(pool)
+
+        waited = max(0.0, started - submitted)
+        pool.completed += 1
+        pool.wait_total += waited
+        pool.wait_max = max(pool.wait_max, waited)
+        if self.metrics is not None:
+            self.metrics.observe("offload_wait_seconds", waited, pool=pool.kind)
+            self.metrics.observe("offload_run_seconds", time.time() - started, pool=pool.kind)
+        return result
+
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Union[int, float]]]:
+        return {
+            kind: {
+                "size": pool.size,
+                "running": pool.running,
+                "queued": pool.queued,
+                "completed": pool.completed,
+                "wait_avg": pool.wait_total / pool.completed if pool.completed else 0.0,
+                "wait_max": pool.wait_max,
+            } for kind, pool in self.pools.items()
+        }
+
+    def shutdown(self) -> None:
+        for pool in self.pools.values():
+            if pool.executor is not None:
+                pool.executor.shutdown(wait=False)
+                pool.executor = None
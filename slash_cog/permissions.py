@@ -0,0 +1,188 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import typing
+from logging import Logger
+
+import aiohttp
+import discord
+from discord.ext import commands
+from discord.http import Route
+
+from . import bulk, command_map
+from .api_constants import ApplicationCommandPermissionType
+
+MAX_PERMISSIONS = 100  # overwrites per command, discord limit
+GATING_CHECKS = ("is_owner", "has_role", "has_any_role")
+
+PermissionKey = typing.Tuple[str, int, bool]
+
+
+def gating_checks(cmd: commands.Command) -> typing.List[typing.Tuple[str, dict]]:
+    found = []
+    for check in cmd.checks:
+        extra_data = check.__dict__.get("slash_extras", None) or {}
+        for name in GATING_CHECKS:
+            if name in extra_data:
+                found.append((name, extra_data[name]))
+    return found
+
+
+def permission_key(entry: dict) -> PermissionKey:
+    return str(entry["id"]), int(entry["type"]), bool(entry["permission"])
+
+
+class PermissionPlan:
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.edit = []  # type: typing.List[typing.Tuple[str, str, typing.List[dict]]]  # command ID, name, permissions
+        self.unchanged = []  # type: typing.List[str]
+        self.unresolved = []  # type: typing.List[str]  # role names that don't exist in the guild
+
+    @property
+    def empty(self) -> bool:
+        return not self.edit
+
+    def summary(self) -> str:
+        summary = f"{len(self.edit)} edited, {len(self.unchanged)} unchanged"
+        if self.unresolved:
+            summary += f", unknown roles: {', '.join(self.unresolved)}"
+        return summary
+
+
+class PermissionsSynchronizer:
+    """
+    Turns the is_owner/has_role/has_any_role checks of top-level commands into guild command permissions and keeps
+    them in sync. The current permissions of a guild are read with a single batch request and only commands whose
+    permissions differ are written. Writing requires a Bearer token with the applications.commands.permissions.update
+    scope, of a user that can manage the guild and its roles; discord doesn't accept bot tokens (or batch writes) there.
+    Commands without such checks are left alone, so permissions set by server admins aren't overwritten.
+    """
+
+    def __init__(self, bot: commands.Bot, log: Logger, bearer_token: str):
+        self.bot = bot
+        self.log = log
+        self.bearer_token = bearer_token
+
+    async def _get(self, endpoint: str, suffix: str = "") -> typing.Any:
+        # same endpoint notation as the cog, "/" being the global commands
+        return await self.bot.http.request(Route(method="GET", path=f"/applications/{self.bot.application_id}{endpoint}/commands{suffix}"))
+
+    async def _role_ids(self, guild_id: int) -> typing.Dict[str, str]:
+        guild = self.bot.get_guild(guild_id)
+        if guild is not None and guild.roles:
+            return {role.name: str(role.id) for role in guild.roles}
+        return {role["name"]: role["id"] for role in await self.bot.http.get_roles(guild_id)}
+
+    async def compile(self, guild_id: int, plan: PermissionPlan = None) -> typing.Dict[str, typing.List[dict]]:
+        """command name -> the permissions its checks translate to in this guild"""
+        gated = {cmd.name: gating_checks(cmd) for cmd in self.bot.commands}
+        gated = {name: checks for name, checks in gated.items() if checks}
+        needs_names = any(isinstance(item, str) for checks in gated.values() for check, data in checks for item in data.get("args", ()))
+        role_ids = await self._role_ids(guild_id) if needs_names else {}
+        owner_ids = await command_map.get_owner_ids(self.bot) if any(c == "is_owner" for checks in gated.values() for c, _ in checks) else set()
+
+        compiled = {}
+        for name, checks in gated.items():
+            # everyone is denied and the checks' users and roles are allowed, discord.py still enforces every check on invoke
+            entries = {(str(guild_id), int(ApplicationCommandPermissionType.ROLE), False)}
+            for check, data in checks:
+                if check == "is_owner":
+                    entries.update((str(owner_id), int(ApplicationCommandPermissionType.USER), True) for owner_id in owner_ids)
+                    continue
+                for item in data.get("args", ()):
+                    role_id = str(item) if isinstance(item, int) else role_ids.get(item, None)
+                    if role_id is None:
+                        if plan is not None:
+                            plan.unresolved.append(str(item))
+                        continue
+                    entries.add((role_id, int(ApplicationCommandPermissionType.ROLE), True))
+            if len(entries) > MAX_PERMISSIONS:
+                self.log.error(f"Command {name} would need {len(entries)} permission overwrites in guild {guild_id} (discord limit: {MAX_PERMISSIONS})")
+                continue
+            compiled[name] = [{"id": i, "type": t, "permission": p} for i, t, p in sorted(entries)]
+        return compiled
+
+    async def plan(self, guild_id: int, global_commands: typing.List[dict] = None) -> PermissionPlan:
+        plan = PermissionPlan(guild_id)
+        desired = await self.compile(guild_id, plan)
+        if not desired:
+            return plan
+
+        if global_commands is None:
+            global_commands = await self._get("/")
+        guild_commands = await self._get(f"/guilds/{guild_id}")
+        ids = {c["name"]: c["id"] for c in global_commands}
+        ids.update({c["name"]: c["id"] for c in guild_commands})
+        current = await self._get(f"/guilds/{guild_id}", "/permissions")
+        current = {p["id"]: {permission_key(entry) for entry in p["permissions"]} for p in current}
+
+        for name, permissions in desired.items():
+            cmd_id = ids.get(name, None)
+            if cmd_id is None:
+                continue  # not registered (hidden, or registered elsewhere)
+            if current.get(cmd_id, set()) == {permission_key(entry) for entry in permissions}:
+                plan.unchanged.append(name)
+            else:
+                plan.edit.append((cmd_id, name, permissions))
+        return plan
+
+    async def _put(self, session: aiohttp.ClientSession, guild_id: int, cmd_id: str, permissions: typing.List[dict],
+                   retries: int = 3) -> None:
+        route = Route(method="PUT", path=f"/applications/{self.bot.application_id}/guilds/{guild_id}/commands/{cmd_id}/permissions")
+        headers = {"Authorization": f"Bearer {self.bearer_token}", "User-Agent": self.bot.http.user_agent}
+        for attempt in range(retries + 1):
+            async with session.put(route.url, json={"permissions": permissions}, headers=headers, proxy=self.bot.http.proxy) as response:
+                if response.status < 300:
+                    return
+                error = discord.HTTPException(response, await response.json(content_type=None) or "")
+            if attempt >= retries or not bulk.is_retryable(error):
+                raise error
+            await asyncio.sleep(bulk.retry_delay(error, attempt))
+
+    async def apply(self, plan: PermissionPlan, session: aiohttp.ClientSession) -> None:
+        # every command has its own route, they're sent one after another to stay polite with the shared bucket
+        for cmd_id, name, permissions in plan.edit:
+            await self._put(session, plan.guild_id, cmd_id, permissions)
+
+    async def sync(self, guild_ids: typing.Iterable[int], concurrency: int = 4) -> bulk.BulkResult:
+        global_commands = await self._get("/")
+        result = bulk.BulkResult()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def sync_guild(session: aiohttp.ClientSession, guild_id: int) -> None:
+            async with limit:
+                try:
+                    plan = await self.plan(guild_id, global_commands)
+                    await self.apply(plan, session)
+                except Exception as e:
+                    result.failed[guild_id] = e
+                    return
+            (result.unchanged if plan.empty else result.registered).append(guild_id)
+            self.log.info(f"Permissions for guild {guild_id}: {plan.summary()}")
+
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(sync_guild(session, guild_id) for guild_id in guild_ids))
+        return result
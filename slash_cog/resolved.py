@@ -0,0 +1,110 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import typing
+
+import discord
+
+from .api_constants import ApplicationCommandOptionType
+
+RESOLVED_OPTION_TYPES = (
+    ApplicationCommandOptionType.USER,
+    ApplicationCommandOptionType.CHANNEL,
+    ApplicationCommandOptionType.ROLE,
+    ApplicationCommandOptionType.MENTIONABLE,
+    ApplicationCommandOptionType.ATTACHMENT,
+)
+
+
+def converter_types(converter: typing.Any) -> typing.Tuple[type, ...]:
+    # plain classes and Optional/Union of classes, anything else is left to discord.py's converters
+    if isinstance(converter, type):
+        return converter,
+    return tuple(t for t in getattr(converter, "__args__", ()) if isinstance(t, type) and t is not type(None))
+
+
+class ResolvedData:
+    """Builds the objects referenced by an interaction's options out of its "resolved" payload, no cache or HTTP lookups"""
+
+    __slots__ = ("state", "guild", "data")
+
+    def __init__(self, interaction: discord.Interaction):
+        self.state = interaction._state
+        self.guild = interaction.guild
+        self.data = (interaction.data or {}).get("resolved", {})  # type: dict
+
+    def user(self, user_id: str) -> typing.List[discord.abc.Snowflake]:
+        candidates = []
+        users = self.data.get("users", {})
+        member = self.data.get("members", {}).get(user_id, None)
+        if member is not None and user_id in users and self.guild is not None:
+            try:
+                candidates.append(discord.Member(data=dict(member, user=users[user_id]), guild=self.guild, state=self.state))
+            except KeyError:
+                pass  # partial member payload this discord.py version can't parse, the user still works
+        if user_id in users:
+            candidates.append(self.state.store_user(users[user_id]))
+        return candidates
+
+    def role(self, role_id: str) -> typing.List[discord.Role]:
+        if self.guild is None:
+            return []
+        role = self.guild.get_role(int(role_id))
+        if role is None and role_id in self.data.get("roles", {}):
+            role = discord.Role(guild=self.guild, state=self.state, data=self.data["roles"][role_id])
+        return [role] if role is not None else []
+
+    def channel(self, channel_id: str) -> typing.List[discord.abc.Snowflake]:
+        # resolved channels are partial, only cached ones can be full channel objects
+        ch = self.guild.get_channel_or_thread(int(channel_id)) if self.guild is not None else None
+        return [ch] if ch is not None else []
+
+    def attachment(self, attachment_id: str) -> typing.List[discord.Attachment]:
+        data = self.data.get("attachments", {}).get(attachment_id, None)
+        return [discord.Attachment(data=data, state=self.state)] if data is not None else []
+
+    def candidates(self, opt: dict) -> typing.List[typing.Any]:
+        opt_type = opt["type"]
+        value = str(opt["value"])
+        if opt_type == ApplicationCommandOptionType.USER:
+            return self.user(value)
+        if opt_type == ApplicationCommandOptionType.ROLE:
+            return self.role(value)
+        if opt_type == ApplicationCommandOptionType.MENTIONABLE:
+            return self.user(value) + self.role(value)
+        if opt_type == ApplicationCommandOptionType.CHANNEL:
+            return self.channel(value)
+        if opt_type == ApplicationCommandOptionType.ATTACHMENT:
+            return self.attachment(value)
+        return []
+
+    def convert(self, opt: dict, converter: typing.Any) -> typing.Optional[typing.Any]:
+        """The resolved object if it satisfies the converter, None to fall back to discord.py's conversion"""
+        types = converter_types(converter)
+        if not types:
+            return None
+        for obj in self.candidates(opt):
+            if isinstance(obj, types):
+                return obj
+        return None
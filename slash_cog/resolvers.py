@@ -0,0 +1,132 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import typing
+
+import discord
+
+from .cache import SingleFlight, TTLCache
+from .metrics import Metrics
+
+MESSAGEABLE_CHANNEL_TYPES = (discord.TextChannel, discord.Thread, discord.DMChannel, discord.GroupChannel, discord.PartialMessageable)
+
+
+def _count(metrics: typing.Optional[Metrics], name: str, cache: str) -> None:
+    if metrics is not None:
+        metrics.incr(name, cache=cache)
+
+
+class MemberResolver:
+    """Resolves the invoking member, preferring the member payload that came with the interaction"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0, metrics: Metrics = None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+        self.metrics = metrics
+        self.fetches = 0
+
+    async def resolve(self, interaction: discord.Interaction) -> typing.Optional[discord.Member]:
+        user = interaction.user
+        if isinstance(user, discord.Member):
+            _count(self.metrics, "cache_hits_total", "member_payload")
+            return user  # built from the interaction's own member payload, roles included
+        guild = interaction.guild
+        if guild is None:
+            return None
+
+        member = guild.get_member(user.id)
+        if member is not None:
+            _count(self.metrics, "cache_hits_total", "member_gateway")
+            return member
+        key = (guild.id, user.id)
+        member = self.cache.get(key, None)
+        if member is None:
+            _count(self.metrics, "cache_misses_total", "member")
+            member = await self.flight.do(key, lambda: self._fetch(guild, user.id))
+            self.cache.set(key, member)
+        else:
+            _count(self.metrics, "cache_hits_total", "member")
+        return member
+
+    async def _fetch(self, guild: discord.Guild, user_id: int) -> discord.Member:
+        self.fetches += 1
+        if self.metrics is not None:
+            self.metrics.incr("http_fallbacks_total", kind="fetch_member")
+        return await guild.fetch_member(user_id)
+
+    def invalidate(self, guild_id: int = None, user_id: int = None) -> None:
+        if guild_id is None or user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop((guild_id, user_id))
+
+
+class ChannelResolver:
+    """Resolves the channel an interaction came from, only fetching when the payload and caches can't provide it"""
+
+    def __init__(self, bot: discord.Client, maxsize: int = 1024, ttl: float = 300.0, metrics: Metrics = None):
+        self.bot = bot
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+        self.metrics = metrics
+        self.fetches = 0
+
+    async def resolve(self, interaction: discord.Interaction) -> typing.Optional[discord.abc.Messageable]:
+        ch = interaction.channel
+        if isinstance(ch, MESSAGEABLE_CHANNEL_TYPES):
+            _count(self.metrics, "cache_hits_total", "channel_payload")
+            return ch  # fast path, built from the interaction payload or the gateway cache
+        channel_id = interaction.channel_id
+        if channel_id is None:
+            return None
+
+        ch = self.bot.get_channel(channel_id) or self.cache.get(channel_id, None)
+        if ch is None:
+            _count(self.metrics, "cache_misses_total", "channel")
+            ch = await self.flight.do(channel_id, lambda: self._fetch(channel_id))
+            self.cache.set(channel_id, ch)
+        else:
+            _count(self.metrics, "cache_hits_total", "channel")
+        return ch
+
+    async def _fetch(self, channel_id: int) -> discord.abc.GuildChannel:
+        self.fetches += 1
+        if self.metrics is not None:
+            self.metrics.incr("http_fallbacks_total", kind="fetch_channel")
+        return await self.bot.fetch_channel(channel_id)
+
+    @staticmethod
+    def can_read(interaction: discord.Interaction, ch: discord.abc.Messageable) -> bool:
+        if interaction.guild_id is None:
+            return True
+        perms = interaction.app_permissions  # sent along with every interaction
+        if perms.value == 0 and not isinstance(ch, discord.PartialMessageable) and getattr(ch.guild, "me", None) is not None:
+            perms = ch.permissions_for(ch.guild.me)  # payload without app_permissions, fall back to the cache
+        return perms.read_messages
+
+    def invalidate(self, channel_id: int = None) -> None:
+        if channel_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(channel_id)
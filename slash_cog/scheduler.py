@@ -0,0 +1,189 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import time
+import typing
+from collections import OrderedDict, deque
+
+from .metrics import Metrics
+
+GuildKey = typing.Union[int, str]
+
+
+class _Waiter:
+    __slots__ = ("guild", "user", "future", "enqueued_at")
+
+    def __init__(self, guild: GuildKey, user: int, future: asyncio.Future):
+        self.guild = guild
+        self.user = user
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class InvocationScheduler:
+    """
+    Bounds how many invocations run at once, globally as well as per guild and per user. Waiting invocations are
+    queued per guild and served round-robin across guilds, so a single busy guild can't starve the others, and
+    ``acquire`` gives up once the caller's deadline passes so that it can still tell the user before discord does.
+    """
+
+    def __init__(self, max_concurrency: int = 64, per_guild: int = 8, per_user: int = 2, max_queue: int = 1000,
+                 metrics: typing.Optional[Metrics] = None):
+        self.max_concurrency = max_concurrency
+        self.per_guild = per_guild
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.metrics = metrics
+
+        self.running = 0
+        self.running_guilds = {}  # type: typing.Dict[GuildKey, int]
+        self.running_users = {}  # type: typing.Dict[int, int]
+        self.queues = OrderedDict()  # type: typing.MutableMapping[GuildKey, typing.Deque[_Waiter]]  # in round-robin order
+        self.queued = 0
+
+        self.admitted = 0
+        self.shed = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "queued_guilds": len(self.queues),
+            "max_depth": self.max_depth,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "wait_avg": self.wait_total / self.admitted if self.admitted else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+    def _can_run(self, guild: GuildKey, user: int) -> bool:
+        return (
+            self.running < self.max_concurrency
+            and self.running_guilds.get(guild, 0) < self.per_guild
+            and self.running_users.get(user, 0) < self.per_user
+        )
+
+    def _start(self, guild: GuildKey, user: int, waited: float) -> None:
+        self.running += 1
+        self.running_guilds[guild] = self.running_guilds.get(guild, 0) + 1
+        self.running_users[user] = self.running_users.get(user, 0) + 1
+        self.admitted += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        if self.metrics is not None:
+            self.metrics.observe("scheduler_wait_seconds", waited)
+
+    def _update_gauges(self) -> None:
+        if self.metrics is not None:
+            self.metrics.set_gauge("scheduler_running", self.running)
+            self.metrics.set_gauge("scheduler_queued", self.queued)
+
+    def _reject(self, reason: str) -> bool:
+        self.shed += 1
+        if self.metrics is not None:
+            self.metrics.incr("interactions_shed_total", reason=reason)
+        return False
+
+    async def acquire(self, guild: GuildKey, user: int, timeout: float) -> bool:
+        """Waits up to ``timeout`` seconds for a slot, which has to be given back with ``release`` if this returns True"""
+        if self._can_run(guild, user) and guild not in self.queues:
+            self._start(guild, user, 0.0)
+            self._update_gauges()
+            return True
+        if self.queued >= self.max_queue:
+            return self._reject("queue_full")
+        if timeout <= 0:
+            return self._reject("deadline")
+
+        waiter = _Waiter(guild, user, asyncio.get_event_loop().create_future())
+        queue = self.queues.get(guild, None)
+        if queue is None:
+            queue = self.queues[guild] = deque()
+        queue.append(waiter)
+        self.queued += 1
+        self.max_depth = max(self.max_depth, self.queued)
+        self._dispatch()  # the guild's queue may only be held up by other users' limits
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return True  # granted right as the deadline passed
+            self._discard(waiter)
+            return self._reject("deadline")
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self.release(guild, user)
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: _Waiter) -> None:
+        waiter.future.cancel()
+        queue = self.queues.get(waiter.guild, None)
+        if queue is not None:
+            queue.remove(waiter)
+            if not queue:
+                del self.queues[waiter.guild]
+        self.queued -= 1
+        self._update_gauges()
+
+    def release(self, guild: GuildKey, user: int) -> None:
+        self.running -= 1
+        for counts, key in ((self.running_guilds, guild), (self.running_users, user)):
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+        self._dispatch()
+        self._update_gauges()
+
+    def _dispatch(self) -> None:
+        # hand free slots to the queued guilds in turn, skipping guilds and users that are at their own limit
+        progress = True
+        while progress and self.queued and self.running < self.max_concurrency:
+            progress = False
+            for guild in list(self.queues.keys()):
+                if self.running >= self.max_concurrency:
+                    break
+                if self.running_guilds.get(guild, 0) >= self.per_guild:
+                    continue
+                queue = self.queues[guild]
+                waiter = next((w for w in queue if self._can_run(guild, w.user)), None)
+                if waiter is None:
+                    continue
+                queue.remove(waiter)
+                if queue:
+                    self.queues.move_to_end(guild)
+                else:
+                    del self.queues[guild]
+                self.queued -= 1
+                self._start(guild, waiter.user, time.monotonic() - waiter.enqueued_at)
+                waiter.future.set_result(True)
+                progress = True
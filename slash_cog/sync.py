@@ -0,0 +1,94 @@
+"""
+MIT License
+
+Copyright (c) 2021-Present CortexPE
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import typing
+
+from .api_constants import ApplicationCommandType
+
+OPTION_KEYS = ("name", "description", "type", "required", "choices", "options", "channel_types", "min_value", "max_value",
+               "min_length", "max_length", "autocomplete")
+OPTION_DEFAULTS = {"required": False, "autocomplete": False, "choices": [], "options": [], "channel_types": []}
+
+
+def normalize_option(opt: dict) -> dict:
+    normalized = {}
+    for k in OPTION_KEYS:
+        v = opt.get(k, None)
+        if v is None or v == OPTION_DEFAULTS.get(k, None):
+            continue
+        if k == "options":
+            v = [normalize_option(sub_opt) for sub_opt in v]
+        elif k == "choices":
+            v = [{"name": c["name"], "value": c["value"]} for c in v]
+        elif k == "type":
+            v = int(v)
+        normalized[k] = v
+    return normalized
+
+
+def normalize_command(cmd: dict) -> dict:
+    """Reduces local and remote command bodies to the fields we generate so that they can be compared"""
+    return {
+        "name": cmd["name"],
+        "description": cmd.get("description", ""),
+        "type": int(cmd.get("type", None) or ApplicationCommandType.CHAT_INPUT),
+        "options": [normalize_option(opt) for opt in cmd.get("options", None) or []],
+        "nsfw": bool(cmd.get("nsfw", False)),
+        "default_permission": cmd.get("default_permission", None) is not False,
+    }
+
+
+class SyncPlan:
+    def __init__(self):
+        self.create = []  # type: typing.List[dict]
+        self.edit = []  # type: typing.List[typing.Tuple[str, dict]]
+        self.delete = []  # type: typing.List[typing.Tuple[str, str]]
+        self.unchanged = []  # type: typing.List[str]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.create or self.edit or self.delete)
+
+    def summary(self) -> str:
+        return (f"{len(self.create)} created, {len(self.edit)} edited, {len(self.delete)} deleted, "
+                f"{len(self.unchanged)} unchanged")
+
+
+def diff_commands(remote: typing.List[dict], local: typing.List[dict]) -> SyncPlan:
+    plan = SyncPlan()
+
+    def key(c: dict) -> typing.Tuple[str, int]:
+        return c["name"], int(c.get("type", None) or ApplicationCommandType.CHAT_INPUT)
+
+    remote_by_key = {key(c): c for c in remote}
+    for cmd in local:
+        existing = remote_by_key.pop(key(cmd), None)
+        if existing is None:
+            plan.create.append(cmd)
+        elif normalize_command(existing) != normalize_command(cmd):
+            plan.edit.append((existing["id"], cmd))
+        else:
+            plan.unchanged.append(cmd["name"])
+    plan.delete = [(c["id"], c["name"]) for c in remote_by_key.values()]
+    return plan